@@ -21,13 +21,23 @@ from mpl_toolkits.mplot3d import Axes3D
 import pyqtcss
 from Forms.engCalcUI import Ui_MainWindow
 from src.planetary_data import planetaryData as plDat
-from src.OrbitPropagator import OrbitParams, OrbitPropogator as OP
-from src.OrbitTools import coes2RvecVvec, Vector2CoesConverter, CoordinateTransforms
+from src.OrbitPropagator import OrbitParams, OrbitPropogator as OP, BatchOrbitPropogator
+from src.OrbitProcessPool import propogateOrbitsInPool
+from src.TrajectoryCache import TrajectoryCache
+from src.MonteCarloDispersion import MonteCarloDispersion
+from src.Porkchop import Porkchop
+from src.ConjunctionScreening import ConjunctionScreening
+from src.GroundStationAccess import GroundStation, GroundStationAccess
+from src.Sgp4 import Sgp4Propogator
+from src.TleCatalog import TleCatalog
+from mplwidget import MplPlotWidget
+from src.OrbitTools import coes2RvecVvec, Vector2CoesConverter, CoordinateTransforms, InvalidParams, julianDate, \
+    groundTrack, splitDateline, OrbitPropogationError
 
 
 ##### QT Imports  ############# 
 from PyQt5 import QtWidgets, uic, QtCore, QtGui
-from PyQt5.QtWidgets import QMainWindow, QMessageBox, QColorDialog
+from PyQt5.QtWidgets import QMainWindow, QMessageBox, QColorDialog, QFileDialog
 import PyQt5
 
 ###### MatPlotLib Imports #########
@@ -59,6 +69,10 @@ restart = False
 highResScreen = False
 EXIT_CODE_REBOOT = -11231351
 theme = None
+multiOrbitBackend = "batch"     # "batch" or "process pool"
+useTrajectoryCache = True
+trajectoryCacheMb = 512
+TRAJECTORY_CACHE_DIR = os.path.join("Resources", "trajectory_cache")
 CONFIG_FILE_DIR = os.path.join("Resources", "config.ini")
 
 
@@ -68,7 +82,11 @@ class Ui(QMainWindow, Ui_MainWindow):
         global theme
         global EXIT_CODE_REBOOT
         global CONFIG_FILE_DIR
+        global multiOrbitBackend
+        global useTrajectoryCache
+        global trajectoryCacheMb
         self.EXIT_CODE_REBOOT = EXIT_CODE_REBOOT
+        self.multiOrbitBackend = multiOrbitBackend
         self.plotLineWidth = 15
         self.scatterPlotPointSize = 60
         self.theme = theme
@@ -81,6 +99,20 @@ class Ui(QMainWindow, Ui_MainWindow):
         self.counter = 0
         self.trajectoryColor = (1, 1, 1, 1)
         self.tleColor = (1, 1, 1, 1)
+        self.maxOrbitDisplayPoints = 20000
+        self.orbitChunkSize = 2000
+        self.orbitStream = None
+        self.orbitStreamOp = None
+        self.maxGroundTrackPoints = 5000
+        self.monteCarlo = None
+        self.monteCarloThread = threading.Thread()
+        self.tleCatalog = None
+        self.maxTlePoints = 500000
+        self.maxElementHistoryPoints = 5000
+        self.elementArtists = {}
+
+        if useTrajectoryCache:
+            OP.setTrajectoryCache(TrajectoryCache(TRAJECTORY_CACHE_DIR, maxDiskBytes=trajectoryCacheMb * 2**20))
 
         self.setupUi(self)
         # uic.loadUi(os.path.join("Forms", "engCalcForm.ui"), self)
@@ -113,11 +145,18 @@ class Ui(QMainWindow, Ui_MainWindow):
         self.enterCoeBtn.clicked.connect(self.change2CoeTab)
         self.initializePvVectorsBtn.clicked.connect(self.initializePvVectorsFromCoes)
         self.orbitColorBtn.clicked.connect(self.getColor)
+        self.tleColorBtn.clicked.connect(self.getTleColor)
         self.convertVectorCoesBtn.clicked.connect(self.vectorCoesConverter)
         self.transformOrbitVectorsBtn.clicked.connect(self.transformOrbitVectors)
 
 
         self.initializePlots()
+        self.initializeOrbitControls()
+        self.initializePorkchopTab()
+        self.initializeConjunctionTab()
+        self.initializeGroundTrackTab()
+        self.initializeAccessTab()
+        self.initializeElementHistoryTab()
         self.planetaryBodyComboBox.addItems(plDat.bodyList)
         self.vecCoesConverterCombobx.addItems(plDat.bodyList)
         frames = CoordinateTransforms.validFrames
@@ -137,6 +176,15 @@ class Ui(QMainWindow, Ui_MainWindow):
         self.trajectoryColor = tuple(newcolors)
 
 
+    def getTleColor(self):
+        color = QColorDialog.getColor()
+        newcolors = []
+        for colors in color.getRgb():
+            newcolors.append(round(colors/255, 1))
+
+        self.tleColor = tuple(newcolors)
+
+
     def change2PVTab(self):
         self.orbitParmStacked.setCurrentIndex(0)
 
@@ -172,6 +220,370 @@ class Ui(QMainWindow, Ui_MainWindow):
         self.linearStressPlot.canvas.ax.get_xaxis().set_minor_locator(mpl.ticker.AutoMinorLocator())
 
 
+    def initializeOrbitControls(self):
+        # Propogator selection sits under the plot color buttons in the orbit parameters form
+        self.propogatorLbl = QtWidgets.QLabel(self.groupBox)
+        font = QtGui.QFont()
+        font.setPointSize(8)
+        font.setBold(True)
+        font.setWeight(75)
+        self.propogatorLbl.setFont(font)
+        self.propogatorLbl.setText("Propogator:")
+        self.propogatorComboBox = QtWidgets.QComboBox(self.groupBox)
+        self.propogatorComboBox.addItems(OP.validPropogators)
+        self.formLayout_3.setWidget(4, QtWidgets.QFormLayout.LabelRole, self.propogatorLbl)
+        self.formLayout_3.setWidget(4, QtWidgets.QFormLayout.FieldRole, self.propogatorComboBox)
+
+        # Monte Carlo dispersion of the orbit in the edits, 1 sigma position and velocity errors
+        self.monteCarloLbl = QtWidgets.QLabel(self.groupBox)
+        self.monteCarloLbl.setFont(font)
+        self.monteCarloLbl.setText("Dispersion (km, km/s, runs):")
+        self.monteCarloLayout = QtWidgets.QHBoxLayout()
+        self.monteCarloSigmaREdit = QtWidgets.QLineEdit("1.0", self.groupBox)
+        self.monteCarloSigmaVEdit = QtWidgets.QLineEdit("0.001", self.groupBox)
+        self.monteCarloRunsEdit = QtWidgets.QLineEdit("1000", self.groupBox)
+        self.monteCarloBtn = QtWidgets.QPushButton("Monte Carlo", self.groupBox)
+        self.monteCarloBtn.clicked.connect(self.runMonteCarlo)
+        for widget in [self.monteCarloSigmaREdit, self.monteCarloSigmaVEdit, self.monteCarloRunsEdit, self.monteCarloBtn]:
+            self.monteCarloLayout.addWidget(widget)
+        self.formLayout_3.setWidget(5, QtWidgets.QFormLayout.LabelRole, self.monteCarloLbl)
+        self.formLayout_3.setLayout(5, QtWidgets.QFormLayout.FieldRole, self.monteCarloLayout)
+
+        # Element set catalogs are drawn in the TLE color next to the color buttons
+        self.loadTleBtn = QtWidgets.QToolButton(self.groupBox)
+        self.loadTleBtn.setText("Load TLE")
+        self.loadTleBtn.clicked.connect(self.loadTleCatalog)
+        self.horizontalLayout_17.addWidget(self.loadTleBtn)
+
+
+    def initializePorkchopTab(self):
+        # Transfer design tab built here since the generated form has no porkchop page
+        self.porkchopTab = QtWidgets.QWidget()
+        layout = QtWidgets.QHBoxLayout(self.porkchopTab)
+        form = QtWidgets.QFormLayout()
+
+        planets = [body for body in plDat.bodyList if getattr(getattr(plDat, body), "ephemeris", None) is not None]
+        self.porkchopDepartureComboBox = QtWidgets.QComboBox(self.porkchopTab)
+        self.porkchopDepartureComboBox.addItems(planets)
+        self.porkchopDepartureComboBox.setCurrentText("Earth")
+        self.porkchopArrivalComboBox = QtWidgets.QComboBox(self.porkchopTab)
+        self.porkchopArrivalComboBox.addItems(planets)
+        self.porkchopArrivalComboBox.setCurrentText("Mars")
+
+        today = QtCore.QDate.currentDate()
+        self.porkchopDepartureDateEdit = QtWidgets.QDateEdit(today, self.porkchopTab)
+        self.porkchopDepartureDaysEdit = QtWidgets.QLineEdit("200", self.porkchopTab)
+        self.porkchopArrivalDateEdit = QtWidgets.QDateEdit(today.addDays(150), self.porkchopTab)
+        self.porkchopArrivalDaysEdit = QtWidgets.QLineEdit("300", self.porkchopTab)
+        self.porkchopGridEdit = QtWidgets.QLineEdit("500", self.porkchopTab)
+        for dateEdit in [self.porkchopDepartureDateEdit, self.porkchopArrivalDateEdit]:
+            dateEdit.setCalendarPopup(True)
+            dateEdit.setDisplayFormat("yyyy-MM-dd")
+
+        self.porkchopBtn = QtWidgets.QPushButton("Calculate Porkchop", self.porkchopTab)
+        self.porkchopBtn.clicked.connect(self.calculatePorkchop)
+
+        form.addRow("Departure Body:", self.porkchopDepartureComboBox)
+        form.addRow("Arrival Body:", self.porkchopArrivalComboBox)
+        form.addRow("Earliest Departure:", self.porkchopDepartureDateEdit)
+        form.addRow("Departure Window (days):", self.porkchopDepartureDaysEdit)
+        form.addRow("Earliest Arrival:", self.porkchopArrivalDateEdit)
+        form.addRow("Arrival Window (days):", self.porkchopArrivalDaysEdit)
+        form.addRow("Grid Points Per Axis:", self.porkchopGridEdit)
+        form.addRow(self.porkchopBtn)
+        layout.addLayout(form)
+
+        self.porkchopPlot = MplPlotWidget(self.porkchopTab)
+        layout.addWidget(self.porkchopPlot, 1)
+        self.tabWidget_3.addTab(self.porkchopTab, "Porkchop Plot")
+
+
+    def calculatePorkchop(self):
+        departure = getattr(plDat, self.porkchopDepartureComboBox.currentText())
+        arrival = getattr(plDat, self.porkchopArrivalComboBox.currentText())
+        depDate = self.porkchopDepartureDateEdit.date()
+        arrDate = self.porkchopArrivalDateEdit.date()
+
+        try:
+            depDays = float(self.porkchopDepartureDaysEdit.text())
+            arrDays = float(self.porkchopArrivalDaysEdit.text())
+            nPoints = int(self.porkchopGridEdit.text())
+            porkchop = Porkchop.fromSpans(departure, arrival, julianDate(depDate.year(), depDate.month(), depDate.day()), depDays,
+                                          julianDate(arrDate.year(), arrDate.month(), arrDate.day()), arrDays, nPoints, nPoints)
+        except (ValueError, InvalidParams) as error:
+            print("Invalid porkchop parameters: {}".format(error))
+            return
+
+        porkchop.compute()
+        if np.all(np.isnan(porkchop.c3)):
+            print("No transfers found, every arrival date is before its departure date")
+            return
+
+        ax = self.porkchopPlot.canvas.ax
+        ax.clear()
+        porkchop.plot(ax)
+        self.porkchopPlot.canvas.draw()
+
+
+    def initializeConjunctionTab(self):
+        # Close approach screening of the orbits in the orbit list
+        self.conjunctionTab = QtWidgets.QWidget()
+        layout = QtWidgets.QVBoxLayout(self.conjunctionTab)
+        controls = QtWidgets.QHBoxLayout()
+
+        self.conjunctionThresholdEdit = QtWidgets.QLineEdit("10", self.conjunctionTab)
+        self.conjunctionStepEdit = QtWidgets.QLineEdit("60", self.conjunctionTab)
+        self.conjunctionBtn = QtWidgets.QPushButton("Screen Loaded Orbits", self.conjunctionTab)
+        self.conjunctionBtn.clicked.connect(self.screenConjunctions)
+        controls.addWidget(QtWidgets.QLabel("Miss Distance Threshold (km):", self.conjunctionTab))
+        controls.addWidget(self.conjunctionThresholdEdit)
+        controls.addWidget(QtWidgets.QLabel("Coarse Step (s):", self.conjunctionTab))
+        controls.addWidget(self.conjunctionStepEdit)
+        controls.addWidget(self.conjunctionBtn)
+        layout.addLayout(controls)
+
+        self.conjunctionTable = QtWidgets.QTableWidget(0, 4, self.conjunctionTab)
+        self.conjunctionTable.setHorizontalHeaderLabels(["Orbit 1", "Orbit 2", "Time of Closest Approach (s)", "Miss Distance (km)"])
+        self.conjunctionTable.horizontalHeader().setSectionResizeMode(QtWidgets.QHeaderView.Stretch)
+        self.conjunctionTable.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.conjunctionTable.setSortingEnabled(True)
+        layout.addWidget(self.conjunctionTable)
+        self.tabWidget_3.addTab(self.conjunctionTab, "Conjunctions")
+
+
+    def screenConjunctions(self):
+        # Only orbits that have been propogated have trajectories to screen
+        propogators = {name: op for name, op in self.currentOrbits.items() if op.getTrajectory() is not None}
+        if len(propogators) < len(self.currentOrbits):
+            print("Skipping {} orbits that have not been propogated".format(len(self.currentOrbits) - len(propogators)))
+
+        if len(propogators) < 2:
+            print("Need at least two propogated orbits to screen")
+            return
+
+        try:
+            threshold = float(self.conjunctionThresholdEdit.text())
+            coarseStep = float(self.conjunctionStepEdit.text())
+            conjunctions = ConjunctionScreening(propogators, threshold, coarseStep).screen()
+        except (ValueError, InvalidParams) as error:
+            print("Unable to screen conjunctions: {}".format(error))
+            return
+
+        # Sorting while filling would move rows under the insert index
+        self.conjunctionTable.setSortingEnabled(False)
+        self.conjunctionTable.setRowCount(len(conjunctions))
+        for row, conjunction in enumerate(conjunctions):
+            values = [str(conjunction["orbit1"]), str(conjunction["orbit2"]), round(float(conjunction["t"]), 3),
+                      round(float(conjunction["distance"]), 4)]
+            for column, value in enumerate(values):
+                item = QtWidgets.QTableWidgetItem()
+                item.setData(QtCore.Qt.DisplayRole, value)
+                self.conjunctionTable.setItem(row, column, item)
+
+        self.conjunctionTable.setSortingEnabled(True)
+
+
+    def initializeGroundTrackTab(self):
+        # Ground tracks of the Earth orbits in the orbit list on a latitude / longitude map
+        self.groundTrackTab = QtWidgets.QWidget()
+        layout = QtWidgets.QVBoxLayout(self.groundTrackTab)
+        controls = QtWidgets.QHBoxLayout()
+
+        self.groundTrackEpochEdit = QtWidgets.QDateTimeEdit(QtCore.QDateTime.currentDateTimeUtc(), self.groundTrackTab)
+        self.groundTrackEpochEdit.setDisplayFormat("yyyy-MM-dd HH:mm:ss")
+        self.groundTrackEpochEdit.setCalendarPopup(True)
+        self.groundTrackBtn = QtWidgets.QPushButton("Plot Ground Tracks", self.groundTrackTab)
+        self.groundTrackBtn.clicked.connect(self.plotGroundTracks)
+        controls.addWidget(QtWidgets.QLabel("Epoch (UTC):", self.groundTrackTab))
+        controls.addWidget(self.groundTrackEpochEdit)
+        controls.addWidget(self.groundTrackBtn)
+        controls.addStretch()
+        layout.addLayout(controls)
+
+        self.groundTrackPlot = MplPlotWidget(self.groundTrackTab)
+        layout.addWidget(self.groundTrackPlot, 1)
+        self.tabWidget_3.addTab(self.groundTrackTab, "Ground Track")
+
+
+    def plotGroundTracks(self):
+        epochTime = self.groundTrackEpochEdit.dateTime()
+        date, clock = epochTime.date(), epochTime.time()
+        epoch = julianDate(date.year(), date.month(), date.day(), clock.hour(), clock.minute(), clock.second())
+
+        ax = self.groundTrackPlot.canvas.ax
+        ax.clear()
+        ax.set_facecolor("#C4C4C4")
+        ax.set_xlim(-180, 180)
+        ax.set_ylim(-90, 90)
+        ax.set_xticks(range(-180, 181, 30))
+        ax.set_yticks(range(-90, 91, 30))
+        ax.grid(b=True, which='major', color='black', linewidth=0.3)
+        ax.set_xlabel("Longitude (deg)")
+        ax.set_ylabel("Latitude (deg)")
+
+        for name, op in self.currentOrbits.items():
+            if op.getTrajectory() is None or op.body is not plDat.Earth:
+                continue
+
+            ts, rs, _ = op.getTrajectory().sampleUniform(min(len(op.getRadiusArray()), self.maxGroundTrackPoints))
+            latitude, longitude = splitDateline(*groundTrack(rs, ts, epoch))
+            ax.plot(longitude, latitude, color=op.color[:3], linewidth=1, label=name)
+            ax.plot(longitude[0], latitude[0], "o", color=op.color[:3], markersize=4)
+
+        if ax.lines:
+            ax.legend(loc="lower left", fontsize=7)
+
+        self.groundTrackPlot.canvas.draw()
+
+
+    def initializeAccessTab(self):
+        # Ground station pass prediction for the orbits in the orbit list
+        self.accessTab = QtWidgets.QWidget()
+        layout = QtWidgets.QHBoxLayout(self.accessTab)
+        controls = QtWidgets.QVBoxLayout()
+
+        controls.addWidget(QtWidgets.QLabel("Stations (name, lat deg, lon deg, alt km, min elevation deg):", self.accessTab))
+        self.accessStationsEdit = QtWidgets.QPlainTextEdit(self.accessTab)
+        self.accessStationsEdit.setPlainText("Goldstone, 35.43, -116.89, 1.0, 10\nMadrid, 40.43, -4.25, 0.8, 10\nCanberra, -35.40, 148.98, 0.7, 10")
+        controls.addWidget(self.accessStationsEdit)
+
+        self.accessEpochEdit = QtWidgets.QDateTimeEdit(QtCore.QDateTime.currentDateTimeUtc(), self.accessTab)
+        self.accessEpochEdit.setDisplayFormat("yyyy-MM-dd HH:mm:ss")
+        self.accessEpochEdit.setCalendarPopup(True)
+        controls.addWidget(QtWidgets.QLabel("Epoch (UTC):", self.accessTab))
+        controls.addWidget(self.accessEpochEdit)
+
+        self.accessBtn = QtWidgets.QPushButton("Compute Access Windows", self.accessTab)
+        self.accessBtn.clicked.connect(self.computeAccessWindows)
+        controls.addWidget(self.accessBtn)
+        layout.addLayout(controls)
+
+        self.accessTable = QtWidgets.QTableWidget(0, 6, self.accessTab)
+        self.accessTable.setHorizontalHeaderLabels(["Station", "Orbit", "Rise (s)", "Set (s)", "Duration (s)", "Max Elevation (deg)"])
+        self.accessTable.horizontalHeader().setSectionResizeMode(QtWidgets.QHeaderView.Stretch)
+        self.accessTable.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.accessTable.setSortingEnabled(True)
+        layout.addWidget(self.accessTable, 2)
+        self.tabWidget_3.addTab(self.accessTab, "Ground Station Access")
+
+
+    def computeAccessWindows(self):
+        stations = []
+        for line in self.accessStationsEdit.toPlainText().splitlines():
+            if not line.strip():
+                continue
+
+            fields = [field.strip() for field in line.split(",")]
+            try:
+                stations.append(GroundStation(fields[0], *[float(field) for field in fields[1:5]]))
+            except (ValueError, TypeError, IndexError):
+                print("Skipping invalid station line: {}".format(line))
+
+        propogators = {name: op for name, op in self.currentOrbits.items() if op.getTrajectory() is not None and op.body is plDat.Earth}
+        if not propogators:
+            print("Need at least one propogated Earth orbit to compute access")
+            return
+
+        epochTime = self.accessEpochEdit.dateTime()
+        date, clock = epochTime.date(), epochTime.time()
+        epoch = julianDate(date.year(), date.month(), date.day(), clock.hour(), clock.minute(), clock.second())
+
+        try:
+            access = GroundStationAccess(stations, propogators, epoch).compute()
+        except InvalidParams as error:
+            print("Unable to compute access: {}".format(error))
+            return
+
+        # Sorting while filling would move rows under the insert index
+        self.accessTable.setSortingEnabled(False)
+        self.accessTable.setRowCount(len(access))
+        for row, window in enumerate(access):
+            values = [str(window["station"]), str(window["orbit"]), round(float(window["rise"]), 2), round(float(window["set"]), 2),
+                      round(float(window["duration"]), 2), round(float(window["maxElevation"]), 2)]
+            for column, value in enumerate(values):
+                item = QtWidgets.QTableWidgetItem()
+                item.setData(QtCore.Qt.DisplayRole, value)
+                self.accessTable.setItem(row, column, item)
+
+        self.accessTable.setSortingEnabled(True)
+
+
+    def initializeElementHistoryTab(self):
+        # Osculating elements against time for the orbits in the orbit list, redrawn when the tab is shown
+        self.elementHistoryTab = QtWidgets.QWidget()
+        layout = QtWidgets.QVBoxLayout(self.elementHistoryTab)
+        self.elementHistoryPlot = MplPlotWidget(self.elementHistoryTab)
+        layout.addWidget(self.elementHistoryPlot)
+
+        fig = self.elementHistoryPlot.canvas.fig
+        fig.clf()
+        self.elementFields = [("semiMajorAxis", "a (km)"), ("eccentricity", "e"), ("inclination", "i (deg)"),
+                              ("raan", "Raan (deg)"), ("argOfPerig", "Arg of Perigee (deg)"), ("trueAnomaly", "True Anomaly (deg)")]
+        self.elementAxes = fig.subplots(3, 2, sharex=True).ravel()
+        for ax, (_, label) in zip(self.elementAxes, self.elementFields):
+            ax.set_facecolor("#C4C4C4")
+            ax.set_ylabel(label, fontsize=8)
+            ax.grid(b=True, which='major', color='black', linewidth=0.3)
+
+        for ax in self.elementAxes[-2:]:
+            ax.set_xlabel("Time (hours)")
+
+        self.tabWidget_3.addTab(self.elementHistoryTab, "Orbital Elements")
+        self.tabWidget_3.currentChanged.connect(self.orbitTabChanged)
+
+
+    def orbitTabChanged(self, index):
+        if self.tabWidget_3.widget(index) is self.elementHistoryTab:
+            self.plotElementHistories()
+
+
+    def plotElementHistories(self):
+        ''' Element histories are cached on each propogator, lines are only touched when an orbit changes'''
+        changed = False
+        shown = set()
+        for name, op in self.currentOrbits.items():
+            history = op.getElementHistory(self.maxElementHistoryPoints)
+            if history is None:
+                continue
+
+            shown.add(name)
+            if name in self.elementArtists and self.elementArtists[name][0] is history:
+                continue
+
+            ts, coes = history
+            hours = ts / 3600
+            if name in self.elementArtists:
+                lines = self.elementArtists[name][1]
+                for line, (field, _) in zip(lines, self.elementFields):
+                    line.set_data(hours, coes[field])
+            else:
+                lines = [ax.plot(hours, coes[field], color=op.color[:3], linewidth=1, label=name)[0]
+                         for ax, (field, _) in zip(self.elementAxes, self.elementFields)]
+
+            self.elementArtists[name] = (history, lines)
+            changed = True
+
+        # Orbits removed from the list take their lines with them
+        for name in [name for name in self.elementArtists if name not in shown]:
+            for line in self.elementArtists.pop(name)[1]:
+                line.remove()
+            changed = True
+
+        if not changed:
+            return
+
+        for ax in self.elementAxes:
+            ax.relim()
+            ax.autoscale_view()
+
+        if self.elementArtists:
+            self.elementAxes[0].legend(loc="upper right", fontsize=7)
+        elif self.elementAxes[0].get_legend() is not None:
+            self.elementAxes[0].get_legend().remove()
+
+        self.elementHistoryPlot.canvas.draw_idle()
+
+
     def calculateGrade(self):
         totalWeight = 0
         totalPoints = 0
@@ -585,49 +997,11 @@ class Ui(QMainWindow, Ui_MainWindow):
 
 
     def addOrbit(self):
-        if not self.orbitInitP1Edit.text() or \
-            not self.orbitInitP2Edit.text() or \
-            not self.orbitInitP3Edit.text():
-            return
-
-        if not self.orbitInitV1Edit.text() or \
-            not self.orbitInitV2Edit.text() or \
-            not self.orbitInitV3Edit.text():
-            return
-        
-        if not self.orbitTimeEdit.text(): return
-        if not self.orbitTimeStepEdit.text(): return
         if not self.orbitNameEdit.text(): return
 
-        if self.planetaryBodyComboBox.currentText() not in plDat.bodyList: return
-
-        r1 = float(self.orbitInitP1Edit.text())
-        r2 = float(self.orbitInitP2Edit.text())
-        r3 = float(self.orbitInitP3Edit.text())
+        params = self.getOrbitParamsFromEdits()
+        if params is None: return
 
-        v1 = float(self.orbitInitV1Edit.text())
-        v2 = float(self.orbitInitV2Edit.text())
-        v3 = float(self.orbitInitV3Edit.text())
-
-        r0 = [r1, r2, r3]
-        v0 = [v1, v2, v3]
-
-        cb = plDat.Earth
-        body = self.planetaryBodyComboBox.currentText()
-
-        if body == "Sun":
-            cb = plDat.Sun
-        
-        timeStep = float(self.orbitTimeStepEdit.text())
-        time = float(self.orbitTimeEdit.text()) * 3600
-
-        params = OrbitParams
-        params.rVec = r0
-        params.vVec = v0
-        params.timelength = time
-        params.timeStep = timeStep
-        params.color = self.trajectoryColor
-        params.cb = cb
         op = OP(params)
 
         name = self.orbitNameEdit.text()
@@ -638,52 +1012,11 @@ class Ui(QMainWindow, Ui_MainWindow):
 
 
     def propogateOrbit(self):
-        if not self.orbitInitP1Edit.text() or \
-            not self.orbitInitP2Edit.text() or \
-            not self.orbitInitP3Edit.text():
-            return
-
-        if not self.orbitInitV1Edit.text() or \
-            not self.orbitInitV2Edit.text() or \
-            not self.orbitInitV3Edit.text():
-            return
-        
-        if not self.orbitTimeEdit.text(): return
-        if not self.orbitTimeStepEdit.text(): return
-
-        if self.planetaryBodyComboBox.currentText() not in plDat.bodyList: return
-
-
-        r1 = float(self.orbitInitP1Edit.text())
-        r2 = float(self.orbitInitP2Edit.text())
-        r3 = float(self.orbitInitP3Edit.text())
+        params = self.getOrbitParamsFromEdits()
+        if params is None: return
 
-        v1 = float(self.orbitInitV1Edit.text())
-        v2 = float(self.orbitInitV2Edit.text())
-        v3 = float(self.orbitInitV3Edit.text())
-
-        r0 = [r1, r2, r3]
-        v0 = [v1, v2, v3]
-
-        cb = plDat.Earth
-        body = self.planetaryBodyComboBox.currentText()
-
-        if body == "Sun":
-            cb = plDat.Sun
-        
-        timeStep = float(self.orbitTimeStepEdit.text())
-        time = float(self.orbitTimeEdit.text()) * 3600
-
-        params = OrbitParams
-        params.rVec = r0
-        params.vVec = v0
-        params.timelength = time
-        params.timeStep = timeStep
-        params.color = self.trajectoryColor
-        params.cb = cb
+        cb = params.cb
         op = OP(params)
-        op.propogateOrbit()
-        rs = op.getRadiusArray()
 
 
         # print(self.trajectoryColor)
@@ -695,21 +1028,64 @@ class Ui(QMainWindow, Ui_MainWindow):
         m1 = gl.GLMeshItem(meshdata=md,smooth=True,color=cb.qtColor,shader="balloon",glOptions="additive")
         self.orbitPlot.plot.addItem(m1)
 
-        # Plot the initial point
-        initialPoint = gl.GLScatterPlotItem(pos=np.array([rs[0,0], rs[0,1], rs[0,2]]), size=np.array([13]), color=(1,0,0,1.5))
-        self.orbitPlot.plot.addItem(initialPoint)
+        # Stream the propogation, the trajectory is drawn chunk by chunk as it is computed
+        nSteps = len(op.getTimeArray())
+        self.orbitStream = op.propogateOrbitChunks(self.orbitChunkSize)
+        self.orbitStreamOp = op
+        self.orbitStreamStride = int(np.ceil(nSteps / self.maxOrbitDisplayPoints))
+        self.orbitStreamPositions = np.empty((int(np.ceil(nSteps / self.orbitStreamStride)), 3), dtype=np.float32)
+        self.orbitStreamCount = 0
+        self.orbitStreamIndex = 0
+        self.orbitStreamLine = None
+        self.drawNextOrbitChunk(self.orbitStream, cb)
+
+
+    def drawNextOrbitChunk(self, stream, cb):
+        # A newer propogation replaced this stream
+        if stream is not self.orbitStream:
+            return
 
-        # Plot the trajectory
-        orbit1 = np.array([rs[:,0], rs[:,1], rs[:,2]]).transpose()
-        orbit = gl.GLLinePlotItem(pos=orbit1, color=self.trajectoryColor, antialias=True) # (0.8, 0.5, 0.6, 1))
-        self.orbitPlot.plot.addItem(orbit)
+        try:
+            ts, rs, vs = next(stream)
+        except StopIteration:
+            orbit1 = self.orbitStreamPositions[:self.orbitStreamCount]
+            self.orbitPlot.zgrid.scale(np.max(orbit1),np.max(orbit1),np.max(orbit1))
+            self.orbitStream = None
 
-        # Adjust the plot
-        self.orbitPlot.plot.setCameraPosition(distance=cb.radius*10)
-        self.orbitPlot.zgrid.scale(np.max(orbit1),np.max(orbit1),np.max(orbit1))
-        self.orbitPlot.scaleAxis(cb.radius*2)
-        self.orbitPlot.createAxis()
-        # self.orbitPlot.createGrid(np.max(orbit1)) # Doesn't Work ?
+            # The whole run is in, switch the line over to zoom dependent levels of detail
+            if self.orbitStreamLine is not None:
+                levels, tolerances = self.orbitStreamOp.getRenderLevels(self.maxOrbitDisplayPoints)
+                self.orbitPlot.setLodLine(self.orbitStreamLine, levels, tolerances)
+            return
+
+        # Keep every stride-th sample of the whole run so the view stays coarse
+        first = (-self.orbitStreamIndex) % self.orbitStreamStride
+        picked = rs[first::self.orbitStreamStride]
+        self.orbitStreamPositions[self.orbitStreamCount:self.orbitStreamCount + len(picked)] = picked
+        self.orbitStreamCount += len(picked)
+        self.orbitStreamIndex += len(ts)
+        orbit1 = self.orbitStreamPositions[:self.orbitStreamCount]
+
+        if self.orbitStreamLine is None:
+            # Plot the initial point
+            initialPoint = gl.GLScatterPlotItem(pos=np.array([rs[0,0], rs[0,1], rs[0,2]]), size=np.array([13]), color=(1,0,0,1.5))
+            self.orbitPlot.plot.addItem(initialPoint)
+
+            # Plot the trajectory
+            self.orbitStreamLine = gl.GLLinePlotItem(pos=orbit1, color=self.trajectoryColor, antialias=True) # (0.8, 0.5, 0.6, 1))
+            self.orbitPlot.plot.addItem(self.orbitStreamLine)
+
+            # Adjust the plot
+            self.orbitPlot.plot.setCameraPosition(distance=cb.radius*10)
+            self.orbitPlot.scaleAxis(cb.radius*2)
+            self.orbitPlot.createAxis()
+            # self.orbitPlot.createGrid(np.max(orbit1)) # Doesn't Work ?
+
+        else:
+            self.orbitStreamLine.setData(pos=orbit1)
+
+        # Yield to the event loop so the view redraws before the next chunk
+        self.timer.singleShot(0, lambda: self.drawNextOrbitChunk(stream, cb))
 
 
 
@@ -721,6 +1097,9 @@ class Ui(QMainWindow, Ui_MainWindow):
         firstPass = True
 
         for orbit, params in self.currentOrbits.items():
+            # Orbits whose propogation failed have nothing to draw
+            if params.getTrajectory() is None:
+                continue
 
             if firstPass:
                 # Create the celestial body
@@ -730,16 +1109,17 @@ class Ui(QMainWindow, Ui_MainWindow):
                 self.orbitPlot.plot.addItem(m1)
                 firstPass = False
             
-            rs = params.getRadiusArray()
+            # Compact float32 positions decimated into levels of detail once after propogation,
+            # the plot picks a level from the camera distance
+            levels, tolerances = params.getRenderLevels(self.maxOrbitDisplayPoints)
+            orbit1 = levels[0]
 
             # Plot the initial point
-            initialPoint = gl.GLScatterPlotItem(pos=np.array([rs[0,0], rs[0,1], rs[0,2]]), size=np.array([13]), color=(1,0,0,1.5))
+            initialPoint = gl.GLScatterPlotItem(pos=orbit1[:1], size=np.array([13]), color=(1,0,0,1.5))
             self.orbitPlot.plot.addItem(initialPoint)
 
             # Plot the trajectory
-            orbit1 = np.array([rs[:,0], rs[:,1], rs[:,2]]).transpose()
-            orbit = gl.GLLinePlotItem(pos=orbit1, color=params.color, antialias=True)
-            self.orbitPlot.plot.addItem(orbit)
+            self.orbitPlot.addLodLine(levels, tolerances, params.color)
 
             # Adjust the plot
             self.orbitPlot.plot.setCameraPosition(distance=params.body.radius*10)
@@ -747,6 +1127,9 @@ class Ui(QMainWindow, Ui_MainWindow):
             self.orbitPlot.scaleAxis(params.body.radius*2)
             self.orbitPlot.createAxis()
 
+        if self.tabWidget_3.currentWidget() is self.elementHistoryTab:
+            self.plotElementHistories()
+
 
     def propogateMultipleOrbits(self):
         if not self.orbitPropogatorThread.is_alive():
@@ -774,13 +1157,184 @@ class Ui(QMainWindow, Ui_MainWindow):
             
 
     def propogateMultipleOrbitsThread(self):
+        # The plot waits on finished, set it however the propogation ends so the progress bar never hangs
+        try:
+            if self.multiOrbitBackend == "process pool":
+                self.propogateMultipleOrbitsPool()
+            else:
+                self.propogateMultipleOrbitsBatched()
+        finally:
+            self.finished = True
+
+
+    def propogateMultipleOrbitsBatched(self):
+        # Orbits sharing a body, time length, time step, propogator and integrator settings are propogated as one batch
+        batches = {}
         for orbit in self.currentOrbitNames:
-            self.currentOrbits[orbit].propogateOrbit()
-            self.counter += 1
-        
-        self.finished = True
+            op = self.currentOrbits[orbit]
+            if op.loadCachedStates(batched=True):
+                op.getRenderLevels(self.maxOrbitDisplayPoints)
+                self.counter += 1
+                continue
+
+            batches.setdefault((op.body.name, op.timeSpan, op.dt, op.propogator, op.substeps, op.rtol, op.atol), []).append(op)
+
+        for propogators in batches.values():
+            try:
+                batch = BatchOrbitPropogator.fromPropogators(propogators)
+                batch.propogateOrbits()
+            except (OrbitPropogationError, InvalidParams) as error:
+                print("Unable to propogate a batch of {} orbits: {}".format(len(propogators), error))
+                self.counter += len(propogators)
+                continue
+
+            for n, op in enumerate(propogators):
+                op.setStateArrays(batch.getRadiusArray(n), batch.getVelocityArray(n), batch.getTrajectory(n))
+                if not batch.hasFailed():
+                    op.storeCachedStates(batched=True)
+                op.getRenderLevels(self.maxOrbitDisplayPoints)
+
+            self.counter += len(propogators)
+
+
+    def propogateMultipleOrbitsPool(self):
+        # Each orbit runs in its own process, the progress bar advances as each one finishes
+        propogators = [self.currentOrbits[orbit] for orbit in self.currentOrbitNames]
+        propogateOrbitsInPool(propogators, progress=self.orbitFinished)
+
+
+    def orbitFinished(self, op):
+        op.getRenderLevels(self.maxOrbitDisplayPoints)
+        self.counter += 1
 
     
+    def getOrbitParamsFromEdits(self) -> OrbitParams:
+        ''' Reads the initial state and timing edits into a fresh OrbitParams, None if any are missing'''
+        edits = [self.orbitInitP1Edit, self.orbitInitP2Edit, self.orbitInitP3Edit,
+                 self.orbitInitV1Edit, self.orbitInitV2Edit, self.orbitInitV3Edit,
+                 self.orbitTimeEdit, self.orbitTimeStepEdit]
+        if not all(edit.text() for edit in edits): return None
+        if self.planetaryBodyComboBox.currentText() not in plDat.bodyList: return None
+
+        try:
+            values = [float(edit.text()) for edit in edits]
+        except ValueError:
+            print("Orbit parameters must be numbers")
+            return None
+
+        params = OrbitParams()
+        params.rVec = values[:3]
+        params.vVec = values[3:6]
+        params.timelength = values[6] * 3600
+        params.timeStep = values[7]
+        params.color = self.trajectoryColor
+        params.cb = plDat.Sun if self.planetaryBodyComboBox.currentText() == "Sun" else plDat.Earth
+        params.propogator = self.propogatorComboBox.currentText()
+        return params
+
+
+    def runMonteCarlo(self):
+        if self.monteCarloThread.is_alive():
+            return
+
+        params = self.getOrbitParamsFromEdits()
+        if params is None: return
+
+        try:
+            sigmaR = float(self.monteCarloSigmaREdit.text())
+            sigmaV = float(self.monteCarloSigmaVEdit.text())
+            runs = int(self.monteCarloRunsEdit.text())
+            self.monteCarlo = MonteCarloDispersion(params, runs, sigmaR, sigmaV)
+        except (ValueError, InvalidParams) as error:
+            print("Invalid Monte Carlo parameters: {}".format(error))
+            return
+
+        self.orbitPBar.setMaximum(0)    # Busy indicator, the batch has no intermediate progress
+        self.monteCarloThread = threading.Thread(target=self.monteCarlo.propogate)
+        self.monteCarloThread.start()
+        self.timer.singleShot(200, self.checkMonteCarloThread)
+
+
+    def checkMonteCarloThread(self):
+        if self.monteCarloThread.is_alive():
+            self.timer.singleShot(200, self.checkMonteCarloThread)
+            return
+
+        self.orbitPBar.setMaximum(1)
+        self.orbitPBar.setValue(1)
+        if self.monteCarlo.rs is not None:
+            self.showMonteCarlo(self.monteCarlo)
+
+
+    def showMonteCarlo(self, monteCarlo):
+        self.orbitPlot.clear()
+
+        # Create the celestial body
+        md = gl.MeshData.sphere(rows=200, cols=300, radius=monteCarlo.body.radius)
+        m1 = gl.GLMeshItem(meshdata=md,smooth=True,color=monteCarlo.body.qtColor,shader="balloon",glOptions="additive")
+        self.orbitPlot.plot.addItem(m1)
+
+        # Nominal orbit and the cloud of dispersed end points
+        nominal = np.ascontiguousarray(monteCarlo.getNominalRadiusArray(), dtype=np.float32)
+        self.orbitPlot.plot.addItem(gl.GLLinePlotItem(pos=nominal, color=self.trajectoryColor, antialias=True))
+        cloud = gl.GLScatterPlotItem(pos=monteCarlo.getPointCloud(), size=3, color=(1, 0.5, 0, 0.8))
+        self.orbitPlot.plot.addItem(cloud)
+
+        self.orbitPlot.plot.setCameraPosition(distance=monteCarlo.body.radius*10)
+        self.orbitPlot.scaleAxis(monteCarlo.body.radius*2)
+        self.orbitPlot.createAxis()
+
+        envelopes = monteCarlo.getDeviationEnvelopes((50, 95, 99))
+        print("Dispersion from nominal at end (km): 50% {:.3f}, 95% {:.3f}, 99% {:.3f}".format(*envelopes[:, -1]))
+
+
+    def loadTleCatalog(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Load TLE Catalog", "", "TLE Files (*.tle *.txt);;All Files (*)")
+        if not path: return
+
+        try:
+            self.tleCatalog = Sgp4Propogator(TleCatalog(path).load())
+        except (OSError, InvalidParams) as error:
+            print("Unable to load TLE catalog: {}".format(error))
+            return
+
+        self.showTleCatalog(self.tleCatalog)
+
+
+    def showTleCatalog(self, catalog):
+        ''' Draws every object at the current time with its track over the orbit time edit, one GL item each'''
+        try:
+            span = float(self.orbitTimeEdit.text()) * 60
+        except ValueError:
+            span = 90.0     # min, about one low earth orbit
+
+        # Samples per track shrink with the catalog size to keep the vertex count bounded
+        nSamples = int(np.clip(self.maxTlePoints // len(catalog.names), 2, 128))
+        now = QtCore.QDateTime.currentDateTimeUtc()
+        date, clock = now.date(), now.time()
+        start = julianDate(date.year(), date.month(), date.day(), clock.hour(), clock.minute(), clock.second())
+        rs, _ = catalog.propogate(start + np.linspace(0, span, nSamples) / 1440)
+
+        valid = ~np.any(np.isnan(rs[..., 0]), axis=1)
+        rs = np.ascontiguousarray(rs[valid], dtype=np.float32)
+
+        self.orbitPlot.clear()
+        md = gl.MeshData.sphere(rows=200, cols=300, radius=plDat.Earth.radius)
+        m1 = gl.GLMeshItem(meshdata=md,smooth=True,color=plDat.Earth.qtColor,shader="balloon",glOptions="additive")
+        self.orbitPlot.plot.addItem(m1)
+
+        if len(rs):
+            # Every track as independent segments so the whole catalog is a single line item
+            segments = np.stack([rs[:, :-1], rs[:, 1:]], axis=2).reshape(-1, 3)
+            self.orbitPlot.plot.addItem(gl.GLLinePlotItem(pos=segments, color=self.tleColor[:3] + (0.4,), mode='lines'))
+            self.orbitPlot.plot.addItem(gl.GLScatterPlotItem(pos=np.ascontiguousarray(rs[:, 0]), size=3, color=self.tleColor))
+
+        self.orbitPlot.plot.setCameraPosition(distance=plDat.Earth.radius*10)
+        self.orbitPlot.scaleAxis(plDat.Earth.radius*2)
+        self.orbitPlot.createAxis()
+        print("Showing {} of {} catalog objects".format(len(rs), len(catalog.names)))
+
+
     def updateCelestialBodyRadius(self):
         body = self.planetaryBodyComboBox.currentText()
         cb = plDat.Earth
@@ -1009,6 +1563,9 @@ class Ui(QMainWindow, Ui_MainWindow):
 
 def readINI():
     global theme
+    global multiOrbitBackend
+    global useTrajectoryCache
+    global trajectoryCacheMb
     highResScreen = False
     global CONFIG_FILE_DIR
 
@@ -1018,6 +1575,9 @@ def readINI():
 
         highResScreen = config.getboolean("Screen_Settings", "4k_Resolution")
         theme = config.get("Screen_Settings", "theme")
+        multiOrbitBackend = config.get("Orbit_Settings", "multi_orbit_backend", fallback="batch")
+        useTrajectoryCache = config.getboolean("Orbit_Settings", "trajectory_cache", fallback=True)
+        trajectoryCacheMb = config.getint("Orbit_Settings", "trajectory_cache_mb", fallback=512)
     
 
     if highResScreen:
@@ -7,12 +7,39 @@ import numpy as np
 import OpenGL.GL as ogl
 
 
+class LodGLViewWidget(gl.GLViewWidget):
+    ''' GL view that reports zoom changes so line detail can follow the camera distance'''
+    def __init__(self, parent=None) -> None:
+        super().__init__(parent)
+        self.cameraChanged = None
+
+    def setCameraPosition(self, *args, **kwargs):
+        super().setCameraPosition(*args, **kwargs)
+        self.notifyCameraChanged()
+
+    def wheelEvent(self, ev):
+        super().wheelEvent(ev)
+        self.notifyCameraChanged()
+
+    def resizeGL(self, w, h):
+        super().resizeGL(w, h)
+        self.notifyCameraChanged()
+
+    def notifyCameraChanged(self):
+        if self.cameraChanged is not None:
+            self.cameraChanged()
+
+
+
 class PlotWidget3D(QWidget):
     def __init__(self, parent=None) -> None:
         super().__init__(parent=parent)
         self.hLayout = QHBoxLayout()
         self.setLayout(self.hLayout)
-        self.plot = gl.GLViewWidget()
+        self.lodLines = []      # [item, levels, tolerances, shown level] per level of detail line
+        self.lodPixels = 0.5    # Largest decimation error allowed on screen, in pixels
+        self.plot = LodGLViewWidget()
+        self.plot.cameraChanged = self.updateLevelsOfDetail
         self.hLayout.addWidget(self.plot)
 
 
@@ -67,7 +94,44 @@ class PlotWidget3D(QWidget):
         self.axis.setSize(x=factor, y=factor, z=factor)
 
 
+    def addLodLine(self, levels: list, tolerances: list, color, antialias=True) -> gl.GLLinePlotItem:
+        ''' Adds a line drawn from one of its decimated levels, finest first, picked from the zoom'''
+        item = gl.GLLinePlotItem(pos=levels[-1], color=color, antialias=antialias)
+        self.plot.addItem(item)
+        self.setLodLine(item, levels, tolerances)
+        return item
+
+    def setLodLine(self, item, levels: list, tolerances: list):
+        ''' Hands the levels of an existing line over to the level of detail selection'''
+        self.lodLines = [line for line in self.lodLines if line[0] is not item]
+        self.lodLines.append([item, levels, tolerances, None])
+        self.updateLevelsOfDetail()
+
+    def getPixelSize(self) -> float:
+        ''' World units covered by one pixel at the camera center'''
+        height = max(self.plot.height(), 1)
+        return 2 * self.plot.opts['distance'] * np.tan(np.radians(self.plot.opts['fov']) / 2) / height
+
+    def updateLevelsOfDetail(self):
+        if not self.lodLines:
+            return
+
+        maxError = self.getPixelSize() * self.lodPixels
+        for line in self.lodLines:
+            item, levels, tolerances, shown = line
+
+            # Coarsest level whose error still fits inside the allowed pixels
+            level = 0
+            for n, tolerance in enumerate(tolerances):
+                if tolerance <= maxError:
+                    level = n
+
+            if level != shown:
+                item.setData(pos=levels[level])
+                line[3] = level
+
     def clear(self):
+        self.lodLines = []
         self.plot.clear()
 
 
@@ -0,0 +1,145 @@
+import numpy as np
+from scipy.spatial import cKDTree
+
+from .OrbitTools import InvalidParams
+
+
+# Result rows, one per close approach
+conjunctionDtype = [("orbit1", "U64"), ("orbit2", "U64"), ("t", float), ("distance", float)]
+
+
+class ConjunctionScreening():
+    '''
+        Finds every close approach below a threshold between propogated orbits about the same body.
+        A perigee/apogee band filter and a kd-tree over coarse samples pick candidate pairs and steps,
+        then the times of closest approach are bisected on the trajectory interpolants, all candidates together
+    '''
+    def __init__(self, propogators: dict, threshold: float, coarseStep: float = 60.0, timeTolerance: float = 1e-3) -> None:
+        self.names = list(propogators.keys())
+        self.trajectories = [propogators[name].getTrajectory() for name in self.names]
+        self.threshold = threshold
+        self.coarseStep = coarseStep
+        self.timeTolerance = timeTolerance
+        self.conjunctions = None
+
+        if threshold <= 0 or coarseStep <= 0:
+            raise InvalidParams("Conjunction threshold and coarse step must be positive")
+
+        if any(trajectory is None for trajectory in self.trajectories):
+            raise InvalidParams("Every orbit must be propogated before screening")
+
+        if len({propogators[name].body.name for name in self.names}) > 1:
+            raise InvalidParams("Screened orbits must share a central body")
+
+        # Only the span every orbit covers can be screened
+        self.tStart = max(trajectory.tStart for trajectory in self.trajectories)
+        self.tEnd = min(trajectory.tEnd for trajectory in self.trajectories)
+
+
+    def screen(self) -> np.array:
+        ''' Returns the close approaches as a structured array sorted by miss distance'''
+        nSamples = max(int(np.ceil((self.tEnd - self.tStart) / self.coarseStep)) + 1, 2)
+        ts = np.linspace(self.tStart, self.tEnd, nSamples)
+        step = ts[1] - ts[0]
+
+        samples = [trajectory.sample(ts) for trajectory in self.trajectories]
+        rs = np.stack([sample[0] for sample in samples])      # (N, T, 3)
+        vs = np.stack([sample[1] for sample in samples])
+
+        # Between samples two objects close by at most their relative speed times half a step
+        radius = self.threshold + np.linalg.norm(vs, axis=2).max() * step
+
+        # Perigee/apogee filter, pairs whose radial bands never come within reach can not meet
+        magR = np.linalg.norm(rs, axis=2)
+        low = magR.min(axis=1) - radius
+        high = magR.max(axis=1) + radius
+        overlaps = (low[:, np.newaxis] <= high[np.newaxis, :]) & (low[np.newaxis, :] <= high[:, np.newaxis])
+        candidates = np.flatnonzero(overlaps.sum(axis=1) > 1)
+
+        first, second, sampleIndex = self.__findCandidates__(rs[candidates], radius)
+        first, second = candidates[first], candidates[second]
+        keep = overlaps[first, second]
+        first, second, sampleIndex = first[keep], second[keep], sampleIndex[keep]
+
+        # Every step touching a candidate sample, once per pair
+        steps = np.concatenate([sampleIndex - 1, sampleIndex])
+        first, second = np.tile(first, 2), np.tile(second, 2)
+        valid = (steps >= 0) & (steps < nSamples - 1)
+        keys = np.unique(np.stack([first[valid], second[valid], steps[valid]], axis=1), axis=0)
+        first, second, steps = keys.T
+
+        # Range rate at both ends of each step, a minimum sits where it goes from closing to opening
+        g0 = np.sum((rs[first, steps] - rs[second, steps]) * (vs[first, steps] - vs[second, steps]), axis=1)
+        g1 = np.sum((rs[first, steps + 1] - rs[second, steps + 1]) * (vs[first, steps + 1] - vs[second, steps + 1]), axis=1)
+        minimum = (g0 < 0) & (g1 >= 0)
+        startEdge = (steps == 0) & (g0 >= 0)
+        endEdge = (steps == nSamples - 2) & (g1 < 0)
+
+        tLow = ts[steps[minimum]]
+        tHigh = ts[steps[minimum] + 1]
+        tca = np.concatenate([self.__bisectClosestApproach__(first[minimum], second[minimum], tLow, tHigh),
+                              ts[steps[startEdge]], ts[steps[endEdge] + 1]])
+        first = np.concatenate([first[minimum], first[startEdge], first[endEdge]])
+        second = np.concatenate([second[minimum], second[startEdge], second[endEdge]])
+
+        r1, _ = self.__evaluate__(first, tca)
+        r2, _ = self.__evaluate__(second, tca)
+        distance = np.linalg.norm(r1 - r2, axis=1)
+        close = distance <= self.threshold
+
+        names = np.array(self.names)
+        self.conjunctions = np.zeros(np.count_nonzero(close), dtype=conjunctionDtype)
+        self.conjunctions["orbit1"] = names[first[close]]
+        self.conjunctions["orbit2"] = names[second[close]]
+        self.conjunctions["t"] = tca[close]
+        self.conjunctions["distance"] = distance[close]
+        self.conjunctions.sort(order="distance")
+        return self.conjunctions
+
+
+    def __findCandidates__(self, rs: np.array, radius: float) -> tuple:
+        '''
+            One kd-tree over every sample with the sample index as a fourth coordinate spaced wider than
+            the search radius, so only samples taken at the same time can pair up.
+            Returns (first orbit, second orbit, sample index) arrays of samples within radius
+        '''
+        nOrbits, nSamples, _ = rs.shape
+        if nOrbits < 2:
+            empty = np.zeros(0, dtype=int)
+            return empty, empty, empty
+
+        timeAxis = np.broadcast_to(np.arange(nSamples, dtype=float) * 3 * radius, (nOrbits, nSamples))
+        points = np.concatenate([rs, timeAxis[..., np.newaxis]], axis=2).reshape(-1, 4)
+        found = cKDTree(points).query_pairs(radius, output_type='ndarray')
+
+        orbit1, sampleIndex = np.divmod(found[:, 0], nSamples)
+        orbit2 = found[:, 1] // nSamples
+        keep = orbit1 != orbit2
+        orbit1, orbit2, sampleIndex = orbit1[keep], orbit2[keep], sampleIndex[keep]
+        return np.minimum(orbit1, orbit2), np.maximum(orbit1, orbit2), sampleIndex
+
+
+    def __bisectClosestApproach__(self, first: np.array, second: np.array, tLow: np.array, tHigh: np.array) -> np.array:
+        ''' Bisects the range rate root of every bracketed step together'''
+        tLow = tLow.copy()
+        tHigh = tHigh.copy()
+        while len(tLow) and np.max(tHigh - tLow) > self.timeTolerance:
+            tMid = 0.5 * (tLow + tHigh)
+            r1, v1 = self.__evaluate__(first, tMid)
+            r2, v2 = self.__evaluate__(second, tMid)
+            closing = np.sum((r1 - r2) * (v1 - v2), axis=1) < 0
+            tLow = np.where(closing, tMid, tLow)
+            tHigh = np.where(closing, tHigh, tMid)
+
+        return 0.5 * (tLow + tHigh)
+
+
+    def __evaluate__(self, orbits: np.array, ts: np.array) -> tuple:
+        ''' States of orbits[k] at ts[k], one interpolant call per distinct orbit'''
+        rs = np.empty((len(ts), 3))
+        vs = np.empty((len(ts), 3))
+        for orbit in np.unique(orbits):
+            mask = orbits == orbit
+            rs[mask], vs[mask] = self.trajectories[orbit].evaluate(ts[mask])
+
+        return rs, vs
@@ -0,0 +1,139 @@
+import numpy as np
+
+from .planetary_data import planetaryData as plDat
+from .OrbitTools import eci2Ecef, InvalidParams
+
+
+# Result rows, one per pass of an orbit over a station
+accessDtype = [("station", "U64"), ("orbit", "U64"), ("rise", float), ("set", float), ("duration", float),
+               ("maxElevation", float)]
+
+
+class GroundStation():
+    def __init__(self, name: str, latitude: float, longitude: float, altitude: float = 0.0, minElevation: float = 10.0) -> None:
+        self.name = name
+        self.latitude = latitude          # deg, geocentric
+        self.longitude = longitude        # deg
+        self.altitude = altitude          # km
+        self.minElevation = minElevation  # deg
+
+
+
+class GroundStationAccess():
+    '''
+        Access windows of many ground stations against many propogated orbits. Look angles for every
+        station and sample of an orbit come from one broadcast, rise and set times are then bisected
+        on the trajectory interpolant for every crossing together
+    '''
+    def __init__(self, stations: list, propogators: dict, epoch: float, coarseStep: float = 30.0, timeTolerance: float = 1e-2,
+                 body: plDat.base = plDat.Earth) -> None:
+        self.stations = list(stations)
+        self.propogators = propogators
+        self.epoch = epoch              # Julian date of t = 0
+        self.coarseStep = coarseStep
+        self.timeTolerance = timeTolerance
+        self.access = None
+
+        if not self.stations:
+            raise InvalidParams("At least one ground station is needed")
+
+        if coarseStep <= 0:
+            raise InvalidParams("Coarse step must be positive")
+
+        lat = np.radians([station.latitude for station in self.stations])
+        lon = np.radians([station.longitude for station in self.stations])
+        alt = np.array([station.altitude for station in self.stations], dtype=float)
+        self.minElevation = np.radians([station.minElevation for station in self.stations])
+
+        # Station positions and east / north / up axes in the Earth fixed frame, (S,3) and (S,3,3)
+        up = np.stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)], axis=1)
+        east = np.stack([-np.sin(lon), np.cos(lon), np.zeros_like(lon)], axis=1)
+        north = np.cross(up, east)
+        self.stationPositions = (body.radius + alt)[:, np.newaxis] * up
+        self.stationAxes = np.stack([east, north, up], axis=1)
+
+
+    def getLookAngles(self, ts: np.array, rs: np.array) -> tuple:
+        '''
+            Elevation, azimuth (rad) and range (km) from every station to (T,3) inertial positions at
+            ts seconds after the epoch. Returns three (S,T) arrays
+        '''
+        ecef = eci2Ecef(rs, self.epoch + np.asarray(ts, dtype=float) / 86400)
+        rho = ecef[np.newaxis, :, :] - self.stationPositions[:, np.newaxis, :]
+        local = np.einsum('sij,stj->sti', self.stationAxes, rho)
+
+        slantRange = np.linalg.norm(local, axis=2)
+        elevation = np.arcsin(local[..., 2] / slantRange)
+        azimuth = np.mod(np.arctan2(local[..., 0], local[..., 1]), 2*np.pi)
+        return elevation, azimuth, slantRange
+
+
+    def compute(self) -> np.array:
+        ''' Returns every pass as a structured array sorted by rise time'''
+        rows = []
+        for name, op in self.propogators.items():
+            trajectory = op.getTrajectory()
+            if trajectory is None:
+                raise InvalidParams("Orbit {} must be propogated before computing access".format(name))
+
+            nSamples = max(int(np.ceil((trajectory.tEnd - trajectory.tStart) / self.coarseStep)) + 1, 2)
+            ts = np.linspace(trajectory.tStart, trajectory.tEnd, nSamples)
+            rs, _ = trajectory.sample(ts)
+            elevation, _, _ = self.getLookAngles(ts, rs)
+            visible = elevation >= self.minElevation[:, np.newaxis]
+
+            # Rising and setting steps of every station, refined together
+            edges = np.diff(visible.astype(np.int8), axis=1)
+            station, step = np.nonzero(edges)
+            crossing = self.__bisectCrossings__(trajectory, station, ts[step], ts[step + 1], edges[station, step] > 0)
+
+            for s in range(len(self.stations)):
+                mine = station == s
+                rises = list(crossing[mine & (edges[station, step] > 0)])
+                sets = list(crossing[mine & (edges[station, step] < 0)])
+
+                # Passes already in progress at either end of the span
+                if visible[s, 0]:
+                    rises.insert(0, ts[0])
+                if visible[s, -1]:
+                    sets.append(ts[-1])
+
+                for rise, setTime in zip(rises, sets):
+                    # Passes shorter than a step have no samples inside, use their midpoint
+                    window = (ts >= rise) & (ts <= setTime)
+                    if np.any(window):
+                        maxElevation = elevation[s, window].max()
+                    else:
+                        maxElevation = self.__elevation__(trajectory, s, 0.5 * (rise + setTime))[0]
+
+                    rows.append((self.stations[s].name, name, rise, setTime, setTime - rise, np.degrees(maxElevation)))
+
+        self.access = np.array(rows, dtype=accessDtype)
+        self.access.sort(order="rise")
+        return self.access
+
+
+    def __bisectCrossings__(self, trajectory, station: np.array, tLow: np.array, tHigh: np.array, rising: np.array) -> np.array:
+        ''' Bisects elevation = station minimum for every bracketed crossing of one orbit together'''
+        tLow = tLow.copy()
+        tHigh = tHigh.copy()
+        while len(tLow) and np.max(tHigh - tLow) > self.timeTolerance:
+            tMid = 0.5 * (tLow + tHigh)
+            above = self.__elevation__(trajectory, station, tMid) >= self.minElevation[station]
+
+            # Rising crossings lie before the first visible time, setting ones after the last
+            later = above != rising
+            tLow = np.where(later, tMid, tLow)
+            tHigh = np.where(later, tHigh, tMid)
+
+        return 0.5 * (tLow + tHigh)
+
+
+    def __elevation__(self, trajectory, station, ts) -> np.array:
+        ''' Elevation from station[k] at ts[k]'''
+        ts = np.atleast_1d(ts)
+        rs, _ = trajectory.evaluate(ts)
+        ecef = eci2Ecef(rs, self.epoch + ts / 86400)
+        rho = ecef - self.stationPositions[station]
+        up = self.stationAxes[station, 2]
+        return np.arcsin(np.sum(rho * up, axis=-1) / np.linalg.norm(rho, axis=-1))
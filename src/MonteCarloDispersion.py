@@ -0,0 +1,89 @@
+import numpy as np
+
+from .OrbitPropagator import OrbitParams, BatchOrbitPropogator, symplecticCoefficients
+from .OrbitTools import InvalidParams
+
+
+class MonteCarloDispersion():
+    '''
+        Propogates thousands of dispersed copies of one orbit as a single vectorized batch.
+        Initial position and velocity errors are Gaussian with a 1 sigma per axis, the nominal
+        orbit always runs as the first member of the batch
+    '''
+    def __init__(self, params: OrbitParams, nSamples: int = 1000, sigmaR: float = 1.0, sigmaV: float = 1e-3,
+                 nOutputs: int = 200, seed: int = None, propogator: str = None) -> None:
+        self.r0 = np.asarray(params.rVec, dtype=float)
+        self.v0 = np.asarray(params.vVec, dtype=float)
+        self.timeSpan = params.timelength
+        self.body = params.cb
+        self.propogator = propogator if propogator is not None else params.propogator
+        self.rtol = params.rtol
+        self.atol = params.atol
+        self.substeps = params.substeps
+        self.nSamples = int(nSamples)
+        self.sigmaR = sigmaR
+        self.sigmaV = sigmaV
+        self.seed = seed
+        self.rs = None      # (nSamples + 1, n_steps, 3), nominal first
+        self.vs = None
+
+        if self.nSamples < 1:
+            raise InvalidParams("Monte Carlo needs at least one dispersed sample")
+
+        if self.timeSpan <= 0:
+            raise InvalidParams("Monte Carlo needs a positive time length")
+
+        # Envelopes only need a coarse output grid, keep the (N, n_steps, 3) arrays small
+        self.dt = max(params.timeStep, self.timeSpan / max(int(nOutputs), 1))
+
+        # Fixed step integrators keep the orbit's own step size through extra substeps
+        if self.propogator in symplecticCoefficients and params.timeStep > 0:
+            self.substeps *= int(np.ceil(self.dt / params.timeStep))
+
+
+    def getInitialStates(self) -> np.array:
+        ''' Returns the (nSamples + 1, 6) initial states, row 0 is the nominal orbit'''
+        rng = np.random.default_rng(self.seed)
+        states = np.empty((self.nSamples + 1, 6))
+        states[:, :3] = self.r0
+        states[:, 3:] = self.v0
+        states[1:, :3] += rng.normal(0, self.sigmaR, (self.nSamples, 3))
+        states[1:, 3:] += rng.normal(0, self.sigmaV, (self.nSamples, 3))
+        return states
+
+
+    def propogate(self) -> None:
+        batch = BatchOrbitPropogator(self.getInitialStates(), self.timeSpan, self.dt, self.body, self.propogator,
+                                     self.rtol, self.atol, self.substeps)
+        batch.propogateOrbits()
+        self.rs = batch.getRadiusArrays()
+        self.vs = batch.getVelocityArrays()
+
+
+    def getTimeArray(self) -> np.array:
+        return np.arange(self.rs.shape[1]) * self.dt
+
+    def getNominalRadiusArray(self) -> np.array:
+        return self.rs[0]
+
+    def getDispersedRadiusArrays(self) -> np.array:
+        return self.rs[1:]
+
+    def getDeviations(self) -> np.array:
+        ''' Returns the (nSamples, n_steps) distance of every dispersed orbit from the nominal'''
+        return np.linalg.norm(self.rs[1:] - self.rs[0], axis=2)
+
+
+    def getDeviationEnvelopes(self, percentiles: tuple = (5, 50, 95)) -> np.array:
+        ''' Returns the (len(percentiles), n_steps) percentiles of the distance from the nominal orbit'''
+        return np.percentile(self.getDeviations(), percentiles, axis=0)
+
+
+    def getAltitudeEnvelopes(self, percentiles: tuple = (5, 50, 95)) -> np.array:
+        ''' Returns the (len(percentiles), n_steps) percentiles of the altitude above the central body'''
+        return np.percentile(np.linalg.norm(self.rs[1:], axis=2) - self.body.radius, percentiles, axis=0)
+
+
+    def getPointCloud(self, index: int = -1) -> np.array:
+        ''' Returns the dispersed positions at one output time as a contiguous float32 (nSamples, 3) array'''
+        return np.ascontiguousarray(self.rs[1:, index], dtype=np.float32)
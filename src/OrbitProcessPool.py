@@ -0,0 +1,95 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing.sharedctypes import RawArray
+import os
+import numpy as np
+
+from .planetary_data import planetaryData as plDat
+from .OrbitPropagator import OrbitParams, OrbitPropogator
+
+
+# Shared state buffers handed to each worker process when it starts
+workerSharedStates = None
+
+
+def initializeSharedStateWorker(sharedStates: list) -> None:
+    global workerSharedStates
+    workerSharedStates = sharedStates
+
+    # Results are cached by the parent process once they come back
+    OrbitPropogator.setTrajectoryCache(None)
+
+
+def propogateSharedStateWorker(index: int, state: np.array, timelength: float, timeStep: float, bodyName: str,
+                               propogator: str, rtol: float, atol: float, substeps: int) -> tuple:
+    '''
+        Propogates one orbit inside a worker process and writes its states into shared memory.
+        Returns (index, rows filled), a solver that stops early fills fewer rows than the buffer holds
+    '''
+    params = OrbitParams()
+    params.rVec = list(state[:3])
+    params.vVec = list(state[3:])
+    params.timelength = timelength
+    params.timeStep = timeStep
+    params.cb = getattr(plDat, bodyName)
+    params.propogator = propogator
+    params.rtol = rtol
+    params.atol = atol
+    params.substeps = substeps
+
+    op = OrbitPropogator(params)
+    op.propogateOrbit()
+
+    filled = len(op.getRadiusArray())
+    ys = np.frombuffer(workerSharedStates[index], dtype=float).reshape(-1, 6)
+    ys[:filled, :3] = op.getRadiusArray()
+    ys[:filled, 3:] = op.getVelocityArray()
+
+    return index, filled
+
+
+
+def propogateOrbitsInPool(propogators: list, maxWorkers: int = None, progress = None) -> None:
+    '''
+        Spreads the orbit propogators across a pool of processes. Every orbit gets a shared memory
+        buffer that the worker fills, so results are never pickled back to this process.
+        progress is called with each propogator as soon as it has finished
+    '''
+    # Orbits already in the trajectory cache never reach the pool
+    remaining = []
+    for op in propogators:
+        if not op.loadCachedStates():
+            remaining.append(op)
+
+        elif progress is not None:
+            progress(op)
+
+    propogators = remaining
+    if len(propogators) == 0:
+        return
+
+    if maxWorkers is None:
+        maxWorkers = min(os.cpu_count() or 1, len(propogators))
+
+    sharedStates = [RawArray('d', len(op.getTimeArray()) * 6) for op in propogators]
+
+    with ProcessPoolExecutor(max_workers=max(maxWorkers, 1), initializer=initializeSharedStateWorker, initargs=(sharedStates,)) as pool:
+        futures = [pool.submit(propogateSharedStateWorker, n, op.getInitialState(), op.timeSpan, op.dt, op.body.name,
+                               op.propogator, op.rtol, op.atol, op.substeps) for n, op in enumerate(propogators)]
+
+        for future in as_completed(futures):
+            # One failed orbit is reported without stopping the others
+            try:
+                n, filled = future.result()
+            except Exception as error:
+                print("Orbit propogation failed in worker: {}".format(error))
+                continue
+
+            op = propogators[n]
+
+            # The arrays keep the shared buffer alive for as long as the orbit holds them
+            ys = np.frombuffer(sharedStates[n], dtype=float).reshape(-1, 6)[:filled]
+            op.setStateArrays(ys[:, :3], ys[:, 3:])
+            op.storeCachedStates()
+
+            if progress is not None:
+                progress(op)
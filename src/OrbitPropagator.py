@@ -2,11 +2,15 @@ from math import degrees
 import numpy as np
 import matplotlib.pyplot as plt
 from numpy.lib.npyio import save
-from scipy.integrate import ode
+from scipy.integrate import ode, solve_ivp, DOP853, OdeSolution
+from scipy.optimize import brentq
 
 from .planetary_data import planetaryData as plDat
 
-from .OrbitTools import plot_n_orbits, coes2RvecVvec
+from .OrbitTools import plot_n_orbits, coes2RvecVvec, keplerUniversalPropogate, vectors2Coes, OrbitPropogationError, InvalidParams
+from .Trajectory import Trajectory, KeplerInterpolant
+from .TrajectoryCache import TrajectoryCache
+from .PolylineLod import buildLevelsOfDetail
 
 
 class OrbitParams:
@@ -24,12 +28,80 @@ class OrbitParams:
     raan = 0
     mu = plDat.Earth.mu
     degrees = False
+    propogator = "lsoda"    # One of OrbitPropogator.validPropogators
+    rtol = 1e-9             # Relative tolerance for the dense output integrator
+    atol = 1e-9             # Absolute tolerance for the dense output integrator
+    substeps = 1            # Symplectic integrator steps per time step
+    events = []             # Names from OrbitPropogator.validEvents detected during dense propogation
+    storagePath = None      # .npy file memory mapped to hold the states, None keeps them in RAM
 
 
 
 
+# Drift (c) and kick (d) coefficients of the symplectic integrators
+symplecticCoefficients = {
+    "leapfrog": ([0.5, 0.5], [1.0, 0.0]),
+    "yoshida4": ([0.5 / (2 - 2**(1/3)), 0.5 * (1 - 2**(1/3)) / (2 - 2**(1/3)),
+                  0.5 * (1 - 2**(1/3)) / (2 - 2**(1/3)), 0.5 / (2 - 2**(1/3))],
+                 [1 / (2 - 2**(1/3)), -2**(1/3) / (2 - 2**(1/3)), 1 / (2 - 2**(1/3)), 0.0]),
+}
+
+
+# Integrators a BatchOrbitPropogator actually runs where they differ from the single orbit ones,
+# lsoda stacks step with DOP853 and both tighten the tolerance with the stack size. Cached batch
+# results are keyed on these so they never stand in for a single orbit run or the other way round
+batchIntegrators = {
+    "lsoda": "dop853-batch",
+    "dense": "dense-batch",
+}
+
+
+def symplecticChunks(r0: np.array, v0: np.array, nSteps: int, timeStep: float, mu: float, method: str = "yoshida4",
+                     substeps: int = 1, chunkSize: int = 2000):
+    '''
+        Generator integrating a stack of (N,3) two-body states with a fixed step symplectic scheme.
+        Each output step is split into substeps integrator steps. Yields (start, rs, vs) with
+        rs, vs of shape (N, n, 3) holding output steps start to start + n
+    '''
+    if method not in symplecticCoefficients:
+        raise InvalidParams("{} symplectic method not supported".format(method))
+
+    drifts, kicks = symplecticCoefficients[method]
+    h = timeStep / substeps
+    stages = [(c * h, d * h * mu) for c, d in zip(drifts, kicks)]
+
+    r = np.array(r0, dtype=float).reshape(-1, 3)
+    v = np.array(v0, dtype=float).reshape(-1, 3)
+
+    for start in range(0, nSteps, chunkSize):
+        n = min(chunkSize, nSteps - start)
+        rs = np.empty((r.shape[0], n, 3))
+        vs = np.empty((r.shape[0], n, 3))
+
+        for step in range(n):
+            if start + step > 0:
+                for _ in range(substeps):
+                    for c, dMu in stages:
+                        r += c * v
+                        if dMu != 0:
+                            k = np.einsum('ij,ij->i', r, r)
+                            k **= -1.5
+                            k *= dMu
+                            v -= k[:, np.newaxis] * r
+
+            rs[:, step] = r
+            vs[:, step] = v
+
+        yield start, rs, vs
+
+
+
 class OrbitPropogator():
-    def __init__(self, params: OrbitParams, useCoes: bool = False) -> None:
+    validPropogators = ["lsoda", "dense", "kepler", "leapfrog", "yoshida4"]
+    validEvents = ["periapsis", "apoapsis", "ascending node", "descending node", "impact"]
+    trajectoryCache = None      # Shared TrajectoryCache, propogation results are not cached when None
+
+    def __init__(self, params: OrbitParams, useCoes: bool = False, propogator: str = None) -> None:
         super().__init__()
         self.r0 = params.rVec
         self.v0 = params.vVec
@@ -38,8 +110,30 @@ class OrbitPropogator():
         self.body = params.cb
         self.rs = None
         self.vs = None
+        self.trajectory = None
         self.color = params.color
         self.params = params
+        self.propogator = propogator if propogator is not None else params.propogator
+        self.rtol = params.rtol
+        self.atol = params.atol
+        self.substeps = params.substeps
+        self.events = list(params.events)
+        self.eventTable = None
+        self.storagePath = params.storagePath
+        self.renderPositions = None
+        self.renderLevels = None
+        self.elementHistory = None
+        self.stm = None
+
+        if self.propogator not in OrbitPropogator.validPropogators:
+            raise InvalidParams("{} propogator not supported".format(self.propogator))
+
+        for event in self.events:
+            if event not in OrbitPropogator.validEvents:
+                raise InvalidParams("{} event not supported".format(event))
+
+        if self.events and self.propogator != "dense":
+            raise InvalidParams("Event detection requires the dense propogator")
 
         if useCoes:
             self.r0, self.v0 = coes2RvecVvec(params.annomoly, params.eccentricity, params.inclination, \
@@ -56,15 +150,299 @@ class OrbitPropogator():
     def getVelocityArray(self) -> np.array:
         return self.vs
 
-    def propogateOrbit(self):
-        n_steps = int(np.ceil(self.timeSpan/self.dt))
+    def getTrajectory(self) -> Trajectory:
+        return self.trajectory
+
+    def getTimeArray(self) -> np.array:
+        return np.arange(int(np.ceil(self.timeSpan/self.dt))) * self.dt
+
+    def getRenderPositions(self, maxPoints: int = None) -> np.array:
+        '''
+            Returns a contiguous float32 (n,3) copy of the body centered positions for plotting,
+            resampled to maxPoints when the run is longer. Built once and reused until the states change
+        '''
+        if self.renderPositions is not None and self.renderPositions[0] == maxPoints:
+            return self.renderPositions[1]
+
+        if self.rs is None:
+            return None
+
+        rs = self.rs
+        if maxPoints is not None and len(rs) > maxPoints:
+            _, rs, _ = self.trajectory.sampleUniform(maxPoints)
+
+        self.renderPositions = (maxPoints, np.ascontiguousarray(rs, dtype=np.float32))
+        return self.renderPositions[1]
+
+    def getRenderLevels(self, maxPoints: int = None, relativeTolerances: tuple = (1e-5, 1e-4, 1e-3, 1e-2)) -> tuple:
+        '''
+            Returns (levels, tolerances), the render positions decimated to each tolerance relative to
+            the orbit size, finest first. Built once and reused until the states change
+        '''
+        key = (maxPoints, tuple(relativeTolerances))
+        if self.renderLevels is not None and self.renderLevels[0] == key:
+            return self.renderLevels[1]
+
+        positions = self.getRenderPositions(maxPoints)
+        if positions is None:
+            return None
+
+        extent = float(np.max(np.abs(positions)))
+        tolerances = [extent * tolerance for tolerance in sorted(relativeTolerances)]
+        self.renderLevels = (key, (buildLevelsOfDetail(positions, tolerances), tolerances))
+        return self.renderLevels[1]
+
+    def getElementHistory(self, maxPoints: int = None) -> tuple:
+        '''
+            Returns (ts, coes), the osculating elements over the run as a coesDtype array in degrees,
+            resampled to maxPoints when the run is longer. Built once and reused until the states change
+        '''
+        if self.elementHistory is not None and self.elementHistory[0] == maxPoints:
+            return self.elementHistory[1]
+
+        if self.rs is None:
+            return None
+
+        if maxPoints is not None and len(self.rs) > maxPoints:
+            ts, rs, vs = self.trajectory.sampleUniform(maxPoints)
+        else:
+            ts, rs, vs = self.getTimeArray()[:len(self.rs)], self.rs, self.vs
+
+        self.elementHistory = (maxPoints, (ts, vectors2Coes(rs, vs, self.body.mu)))
+        return self.elementHistory[1]
+
+    def getStateTransitionArray(self) -> np.array:
+        ''' Returns the (n,6,6) state transition matrices from propogateStateTransition'''
+        return self.stm
+
+    def getEventTable(self) -> np.array:
+        ''' Returns the detected events as a structured array sorted by time, fields event, t, r, v'''
+        return self.eventTable
+
+    def hasImpacted(self) -> bool:
+        return self.eventTable is not None and bool(np.any(self.eventTable["event"] == "impact"))
+
+    def getInitialState(self) -> np.array:
+        return np.hstack([self.r0, self.v0]).astype(float)
+
+    def setStateArrays(self, rs: np.array, vs: np.array, trajectory: Trajectory = None) -> None:
+        ''' Stores position and velocity arrays propogated outside of this object'''
+        self.rs = rs
+        self.vs = vs
+        self.renderPositions = None
+        self.renderLevels = None
+        self.elementHistory = None
+
+        if trajectory is None and self.propogator == "kepler":
+            trajectory = Trajectory(KeplerInterpolant(self.r0, self.v0, self.body.mu), 0, self.getTimeArray()[-1])
+
+        elif trajectory is None:
+            trajectory = Trajectory.fromSamples(self.getTimeArray()[:len(rs)], rs, vs, self.body.mu)
+
+        self.trajectory = trajectory
+
+    @staticmethod
+    def setTrajectoryCache(cache: TrajectoryCache) -> None:
+        OrbitPropogator.trajectoryCache = cache
+
+    def getCacheKey(self, batched: bool = False) -> str:
+        ''' Key of this run, batched selects the integrator a BatchOrbitPropogator would run instead'''
+        integrator = batchIntegrators.get(self.propogator, self.propogator) if batched else self.propogator
+        return TrajectoryCache.makeKey(self.r0, self.v0, self.body.mu, self.timeSpan, self.dt, integrator, self.rtol, self.atol,
+                                       self.substeps)
+
+    def isCacheable(self, batched: bool = False) -> bool:
+        '''
+            Event tables are not cached and memory mapped runs already persist to their own file. A single
+            dense run's trajectory is the solver's own interpolant, which the cached samples can not rebuild
+        '''
+        return OrbitPropogator.trajectoryCache is not None and not self.events and self.storagePath is None \
+            and (batched or self.propogator != "dense")
+
+    def loadCachedStates(self, batched: bool = False) -> bool:
+        ''' Fills the state arrays from the trajectory cache, returns False on a miss'''
+        if not self.isCacheable(batched):
+            return False
+
+        cached = OrbitPropogator.trajectoryCache.get(self.getCacheKey(batched))
+        if cached is None:
+            return False
+
+        self.setStateArrays(*cached)
+        return True
+
+    def storeCachedStates(self, batched: bool = False) -> None:
+        if self.rs is not None and self.isCacheable(batched):
+            OrbitPropogator.trajectoryCache.put(self.getCacheKey(batched), self.rs, self.vs)
+
+    def openStoredStates(self) -> bool:
+        '''
+            Maps the states of an earlier run from the storage file without reading it into memory,
+            returns False if there is no usable file
+        '''
+        if self.storagePath is None:
+            return False
+
+        # The run parameters are kept next to the states, a file is only used by the run that wrote it
+        try:
+            with np.load(self.getStorageParamsPath()) as stored:
+                matches = np.array_equal(stored["state"], self.getInitialState()) and stored["mu"] == self.body.mu \
+                    and stored["timelength"] == self.timeSpan and stored["timeStep"] == self.dt
+        except (OSError, ValueError, KeyError):
+            return False
+
+        if not matches:
+            print("Storage file {} was written by a different orbit or time grid".format(self.storagePath))
+            return False
+
+        try:
+            ys = np.load(self.storagePath, mmap_mode='r')
+        except (OSError, ValueError):
+            return False
+
+        if ys.shape != (len(self.getTimeArray()), 6) or len(ys) < 2 or not np.array_equal(ys[0], self.getInitialState()) \
+                or not np.any(ys[1, :3]):
+            print("Storage file {} does not match the orbit parameters".format(self.storagePath))
+            return False
+
+        # Runs ending early leave zeroed rows behind, states are filled in order so bisect for the end
+        low, high = 1, len(ys)
+        while low < high:
+            mid = (low + high) // 2
+            if np.any(ys[mid, :3]):
+                low = mid + 1
+            else:
+                high = mid
+
+        self.setStateArrays(ys[:low,:3], ys[:low,3:])
+        return True
+
+    def getStorageParamsPath(self) -> str:
+        return self.storagePath + ".params.npz"
+
+    def __allocateStates__(self, n_steps: int) -> np.array:
+        ''' Returns the (n_steps, 6) state buffer, memory mapped to the storage file when one is set'''
+        if self.storagePath is None:
+            return np.zeros((n_steps, 6))
+
+        ys = np.lib.format.open_memmap(self.storagePath, mode='w+', dtype=float, shape=(n_steps, 6))
+        with open(self.getStorageParamsPath(), "wb") as paramsFile:
+            np.savez(paramsFile, state=self.getInitialState(), mu=self.body.mu, timelength=self.timeSpan, timeStep=self.dt)
+
+        return ys
+
+
+    def propogateOrbit(self) -> Trajectory:
+        ''' Propogates the orbit, fills the position and velocity arrays and returns the trajectory'''
+        if self.loadCachedStates():
+            return self.trajectory
+
+        # Memory mapped runs always go through the chunked path so the file fills incrementally
+        if self.storagePath is not None:
+            for _ in self.propogateOrbitChunks():
+                pass
+
+        elif self.propogator == "kepler":
+            self.__propogateKepler__()
+
+        elif self.propogator == "dense" and self.events:
+            self.__propogateDenseEvents__()
+
+        elif self.propogator == "dense":
+            self.__propogateDense__()
+
+        elif self.propogator in symplecticCoefficients:
+            self.__propogateSymplectic__()
+
+        else:
+            self.__propogateLsoda__()
+
+        self.storeCachedStates()
+        return self.trajectory
+
+
+    def propogateOrbitChunks(self, chunkSize: int = 2000):
+        '''
+            Generator propogating the orbit a piece at a time, yields (ts, rs, vs) chunks of about
+            chunkSize samples as soon as they are available. Once exhausted the position and velocity
+            arrays and the trajectory are filled exactly as propogateOrbit would
+        '''
+        ts = self.getTimeArray()
+
+        if self.loadCachedStates():
+            for start in range(0, len(ts), chunkSize):
+                yield ts[start:start + chunkSize], self.rs[start:start + chunkSize], self.vs[start:start + chunkSize]
+            return
+
+        ys = self.__allocateStates__(len(ts))
+
+        if self.propogator == "kepler":
+            trajectory, filled = yield from self.__keplerChunks__(ts, ys, chunkSize)
+
+        elif self.propogator == "dense":
+            trajectory, filled = yield from self.__denseChunks__(ts, ys, chunkSize)
 
-        ys = np.zeros((n_steps, 6))
-        ts = np.zeros((n_steps, 1))
+        elif self.propogator in symplecticCoefficients:
+            trajectory, filled = yield from self.__symplecticChunks__(ts, ys, chunkSize)
 
-        y0 = self.r0 + self.v0
-        ys[0] = np.array(y0)
+        else:
+            trajectory, filled = yield from self.__lsodaChunks__(ts, ys, chunkSize)
+
+        if isinstance(ys, np.memmap):
+            ys.flush()
+
+        self.setStateArrays(ys[:filled,:3], ys[:filled,3:], trajectory)
+        self.storeCachedStates()
+
+
+    def propogateStateTransition(self) -> np.array:
+        '''
+            Integrates the 6x6 state transition matrix alongside the state using the analytic
+            two-body partials, fills the state arrays and returns the (n,6,6) matrices
+        '''
+        ts = self.getTimeArray()
+        tEnd = max(ts[-1], self.dt)
+        y0 = np.hstack([self.getInitialState(), np.eye(6).ravel()])
+
+        sol = solve_ivp(self.__variationalDiffyQ__, (0, tEnd), y0, method='DOP853',
+                        dense_output=True, rtol=self.rtol, atol=self.atol)
+
+        if not sol.success:
+            raise OrbitPropogationError(sol.message)
+
+        ys = sol.sol(ts).T
+        self.setStateArrays(np.ascontiguousarray(ys[:,:3]), np.ascontiguousarray(ys[:,3:6]))
+        self.stm = ys[:,6:].reshape(-1, 6, 6)
+        return self.stm
+
+
+    def mapCovariance(self, covariance: np.array) -> np.array:
+        ''' Maps an initial 6x6 state covariance to every output time, returns (n,6,6)'''
+        if self.stm is None:
+            self.propogateStateTransition()
+
+        covariance = np.asarray(covariance, dtype=float)
+        if covariance.shape != (6, 6):
+            raise InvalidParams("Covariance must be a 6x6 matrix")
+
+        return self.stm @ covariance @ self.stm.transpose(0, 2, 1)
+
+
+    def __propogateLsoda__(self):
+        ts = self.getTimeArray()
+        ys = np.zeros((len(ts), 6))
+
+        trajectory, filled = self.__runChunks__(self.__lsodaChunks__(ts, ys, len(ts)))
+        self.setStateArrays(ys[:filled,:3], ys[:filled,3:], trajectory)
+
+
+    def __lsodaChunks__(self, ts: np.array, ys: np.array, chunkSize: int):
+        n_steps = len(ts)
+
+        y0 = self.getInitialState()
+        ys[0] = y0
         step = 1
+        lastYield = 0
 
         solver = ode(self.__diffyQ__)
         solver.set_integrator('lsoda')
@@ -72,13 +450,209 @@ class OrbitPropogator():
 
         while solver.successful() and step < n_steps:
             solver.integrate(solver.t + self.dt)
-            ts[step] = solver.t
             ys[step] = solver.y
             step += 1
 
+            if step - lastYield >= chunkSize:
+                yield ts[lastYield:step], ys[lastYield:step, :3], ys[lastYield:step, 3:]
+                lastYield = step
+
+        if lastYield < step:
+            yield ts[lastYield:step], ys[lastYield:step, :3], ys[lastYield:step, 3:]
+
+        return None, step
+
+
+    def __propogateSymplectic__(self):
+        ts = self.getTimeArray()
+        ys = np.zeros((len(ts), 6))
+
+        trajectory, filled = self.__runChunks__(self.__symplecticChunks__(ts, ys, len(ts)))
+        self.setStateArrays(ys[:filled,:3], ys[:filled,3:], trajectory)
+
+
+    def __propogateDenseEvents__(self):
+        ''' Dense propogation stepped by hand so events are root found as each step completes'''
+        ts = self.getTimeArray()
+        ys = np.zeros((len(ts), 6))
+
+        trajectory, filled = self.__runChunks__(self.__denseChunks__(ts, ys, len(ts)))
+        self.setStateArrays(ys[:filled,:3], ys[:filled,3:], trajectory)
+
+
+    @staticmethod
+    def __runChunks__(chunks) -> tuple:
+        ''' Exhausts a chunk generator and returns its (trajectory, filled) result'''
+        while True:
+            try:
+                next(chunks)
+            except StopIteration as stop:
+                return stop.value
+
+
+    def __symplecticChunks__(self, ts: np.array, ys: np.array, chunkSize: int):
+        for start, rs, vs in symplecticChunks(self.r0, self.v0, len(ts), self.dt, self.body.mu, self.propogator, self.substeps, chunkSize):
+            stop = start + rs.shape[1]
+            ys[start:stop, :3] = rs[0]
+            ys[start:stop, 3:] = vs[0]
+            yield ts[start:stop], ys[start:stop, :3], ys[start:stop, 3:]
+
+        return None, len(ts)
+
+
+    def __keplerChunks__(self, ts: np.array, ys: np.array, chunkSize: int):
+        for start in range(0, len(ts), chunkSize):
+            stop = min(start + chunkSize, len(ts))
+            ys[start:stop, :3], ys[start:stop, 3:] = keplerUniversalPropogate(self.r0, self.v0, ts[start:stop], self.body.mu)
+            yield ts[start:stop], ys[start:stop, :3], ys[start:stop, 3:]
+
+        return Trajectory(KeplerInterpolant(self.r0, self.v0, self.body.mu), 0, ts[-1]), len(ts)
+
+
+    def __denseChunks__(self, ts: np.array, ys: np.array, chunkSize: int):
+        '''
+            Steps the dense output integrator by hand, sampling each step's interpolant as it completes.
+            Requested events are root found on the step interpolant, a terminal event ends the run early
+        '''
+        tEnd = max(ts[-1], self.dt)
+        solver = DOP853(self.__diffyQ__, 0, self.getInitialState(), tEnd, rtol=self.rtol, atol=self.atol)
+
+        eventFunctions = self.__getEventFunctions__()
+        eventValues = [function(0, solver.y) for _, function, _, _ in eventFunctions]
+        foundEvents = []
+        tStop = None
+
+        segmentTimes = [0.0]
+        interpolants = []
+        filled = 0
+        lastYield = 0
+
+        while filled < len(ts) and tStop is None:
+            tOld = solver.t
+            message = solver.step()
+            if solver.status == 'failed':
+                raise OrbitPropogationError(message)
+
+            interpolant = solver.dense_output()
+            segmentTimes.append(solver.t)
+            interpolants.append(interpolant)
+
+            if eventFunctions:
+                tStop = self.__findEvents__(eventFunctions, eventValues, interpolant, tOld, solver.t, solver.y, foundEvents)
+
+            tLast = solver.t if tStop is None else tStop
+            stop = np.searchsorted(ts, tLast, side='right')
+            if stop > filled:
+                ys[filled:stop] = interpolant(ts[filled:stop]).T
+                filled = stop
+
+            if filled - lastYield >= chunkSize or filled == len(ts) or (tStop is not None and filled > lastYield):
+                yield ts[lastYield:filled], ys[lastYield:filled, :3], ys[lastYield:filled, 3:]
+                lastYield = filled
+
+        # Finish the span so the trajectory covers the same interval as propogateOrbit
+        while solver.status == 'running' and tStop is None:
+            tOld = solver.t
+            message = solver.step()
+            if solver.status == 'failed':
+                raise OrbitPropogationError(message)
+
+            segmentTimes.append(solver.t)
+            interpolants.append(solver.dense_output())
+
+            if eventFunctions:
+                tStop = self.__findEvents__(eventFunctions, eventValues, interpolants[-1], tOld, solver.t, solver.y, foundEvents)
+
+        if eventFunctions:
+            self.__setEventTable__(foundEvents)
+
+        if tStop is not None:
+            # Trim the last segment so the trajectory ends at the terminal event
+            if tStop > segmentTimes[-2] or len(interpolants) == 1:
+                segmentTimes[-1] = max(tStop, segmentTimes[-2] + 1e-12)
+            else:
+                segmentTimes.pop()
+                interpolants.pop()
+            return Trajectory(OdeSolution(segmentTimes, interpolants), 0, tStop), filled
+
+        return Trajectory(OdeSolution(segmentTimes, interpolants), 0, tEnd), filled
+
+
+    def __getEventFunctions__(self) -> list:
+        ''' Returns (name, function, direction, terminal) for every requested event'''
+        radius = self.body.radius
+        functions = {
+            "periapsis":       (lambda t, y: y[0]*y[3] + y[1]*y[4] + y[2]*y[5], 1, False),
+            "apoapsis":        (lambda t, y: y[0]*y[3] + y[1]*y[4] + y[2]*y[5], -1, False),
+            "ascending node":  (lambda t, y: y[2], 1, False),
+            "descending node": (lambda t, y: y[2], -1, False),
+            "impact":          (lambda t, y: np.sqrt(y[0]**2 + y[1]**2 + y[2]**2) - radius, -1, True),
+        }
+
+        return [(name,) + functions[name] for name in self.events]
+
+
+    def __findEvents__(self, eventFunctions: list, eventValues: list, interpolant, tOld: float, tNew: float,
+                       yNew: np.array, foundEvents: list) -> float:
+        ''' Root finds sign changes of the event functions over one step, returns the terminal time or None'''
+        stepEvents = []
+        for n, (name, function, direction, terminal) in enumerate(eventFunctions):
+            gOld = eventValues[n]
+            gNew = function(tNew, yNew)
+            eventValues[n] = gNew
+
+            crossed = (direction > 0 and gOld < 0 <= gNew) or (direction < 0 and gOld > 0 >= gNew)
+            if not crossed:
+                continue
+
+            tEvent = brentq(lambda t: function(t, interpolant(t)), tOld, tNew, xtol=1e-9)
+            stepEvents.append((tEvent, name, terminal))
 
-        self.rs = ys[:,:3]
-        self.vs = ys[:,3:]
+        tStop = None
+        for tEvent, name, terminal in sorted(stepEvents):
+            if tStop is not None:
+                break
+
+            foundEvents.append((name, tEvent, interpolant(tEvent)))
+            if terminal:
+                tStop = tEvent
+
+        return tStop
+
+
+    def __setEventTable__(self, foundEvents: list) -> None:
+        table = np.zeros(len(foundEvents), dtype=[("event", "U16"), ("t", float), ("r", float, 3), ("v", float, 3)])
+        for n, (name, tEvent, y) in enumerate(foundEvents):
+            table[n] = (name, tEvent, y[:3], y[3:])
+
+        self.eventTable = table
+
+
+    def __propogateKepler__(self):
+        ''' Analytic two-body solution evaluated at every output time in one call'''
+        ts = self.getTimeArray()
+
+        rs, vs = keplerUniversalPropogate(self.r0, self.v0, ts, self.body.mu)
+        self.setStateArrays(rs, vs, Trajectory(KeplerInterpolant(self.r0, self.v0, self.body.mu), 0, ts[-1]))
+
+
+    def __propogateDense__(self):
+        '''
+            Integrates the whole time span in one solver call, the solver picks its own steps
+            and every output time is sampled from the dense output interpolant at once
+        '''
+        ts = self.getTimeArray()
+        tEnd = max(ts[-1], self.dt)
+
+        sol = solve_ivp(self.__diffyQ__, (0, tEnd), self.getInitialState(), method='DOP853',
+                        dense_output=True, rtol=self.rtol, atol=self.atol)
+
+        if not sol.success:
+            raise OrbitPropogationError(sol.message)
+
+        trajectory = Trajectory(sol.sol, 0, tEnd)
+        rs, vs = trajectory.sample(ts)
+        self.setStateArrays(rs, vs, trajectory)
 
 
     def plot(self, showPlot=True, savePlot=False, title="orbit"):
@@ -128,15 +702,198 @@ class OrbitPropogator():
     def __diffyQ__(self, t, y):
         rx,ry,rz,vx,vy,vz=y
 
-        r = np.array([rx,ry,rz])
+        # Scalar math, building a temporary array per call dominates the solver time
+        k = -self.body.mu / (rx*rx + ry*ry + rz*rz)**1.5
+
+        return [vx,vy,vz,k*rx,k*ry,k*rz]
+
+
+
+    def __variationalDiffyQ__(self, t, y):
+        r = y[:3]
+        phi = y[6:].reshape(6, 6)
+        r2 = r @ r
+        mu = self.body.mu
+
+        # Gravity gradient, the only non trivial block of the two-body Jacobian [[0, I], [G, 0]]
+        G = mu / r2**2.5 * (3 * np.outer(r, r) - r2 * np.eye(3))
+
+        dy = np.empty(42)
+        dy[:3] = y[3:6]
+        dy[3:6] = -mu * r / r2**1.5
+        dy[6:24] = phi[3:].ravel()
+        dy[24:] = (G @ phi[:3]).ravel()
+        return dy
 
-        norm_r = np.linalg.norm(r)
 
-        ax,ay,az = -r * self.body.mu / norm_r**3
 
-        return [vx,vy,vz,ax,ay,az]
+class BatchOrbitPropogator():
+    '''
+        Propogates a stack of N orbits about the same central body together.
+        All orbits share one solver, so each integrator step costs a single
+        vectorized evaluation of the two-body equations for the whole stack
+    '''
+    energyTolerance = 1e-3      # Specific energy drift, relative to mu / |r0|, that marks an orbit as failed
 
+    def __init__(self, states: np.array, timelength: float, timeStep: float, body = plDat.Earth, propogator: str = "lsoda",
+                 rtol: float = OrbitParams.rtol, atol: float = OrbitParams.atol, substeps: int = OrbitParams.substeps) -> None:
+        self.y0 = np.array(states, dtype=float).reshape(-1, 6)
+        self.nOrbits = self.y0.shape[0]
+        self.timeSpan = timelength
+        self.dt = timeStep
+        self.body = body
+        self.propogator = propogator
+        self.rtol = rtol
+        self.atol = atol
+        self.substeps = substeps
+        self.rs = None      # (N, n_steps, 3), NaN past the end of orbits that stopped early
+        self.vs = None      # (N, n_steps, 3)
+        self.filled = None  # (N,) output steps each orbit reached
+        self.failed = False # Some orbits failed in the shared solver and were finished one at a time
+
+
+    @staticmethod
+    def fromPropogators(propogators: list) -> 'BatchOrbitPropogator':
+        ''' Builds a batch from orbit propogators sharing a central body, time length, time step and propogator'''
+        first = propogators[0]
+        for op in propogators:
+            if op.body is not first.body or op.timeSpan != first.timeSpan or op.dt != first.dt \
+                or op.propogator != first.propogator or op.substeps != first.substeps:
+                raise OrbitPropogationError("Batched orbits must share central body, time length, time step and propogator")
+
+            if op.events:
+                raise OrbitPropogationError("Orbits detecting events can not be batched")
+
+        states = np.array([op.getInitialState() for op in propogators])
+        return BatchOrbitPropogator(states, first.timeSpan, first.dt, first.body, first.propogator, first.rtol, first.atol, first.substeps)
+
+
+    def getRadiusArray(self, index: int) -> np.array:
+        return self.rs[index, :self.filled[index]]
+
+    def getVelocityArray(self, index: int) -> np.array:
+        return self.vs[index, :self.filled[index]]
+
+    def getRadiusArrays(self) -> np.array:
+        return self.rs
+
+    def getVelocityArrays(self) -> np.array:
+        return self.vs
+
+    def hasFailed(self) -> bool:
+        return self.failed
+
+    def getTrajectory(self, index: int) -> Trajectory:
+        ts = np.arange(self.filled[index]) * self.dt
+
+        if self.propogator == "kepler":
+            return Trajectory(KeplerInterpolant(self.y0[index, :3], self.y0[index, 3:], self.body.mu), 0, ts[-1])
+
+        return Trajectory.fromSamples(ts, self.getRadiusArray(index), self.getVelocityArray(index), self.body.mu)
+
+
+    def propogateOrbits(self):
+        n_steps = int(np.ceil(self.timeSpan/self.dt))
+        self.filled = np.full(self.nOrbits, n_steps)
+        self.failed = False
 
+        if self.propogator == "kepler":
+            ts = np.arange(n_steps) * self.dt
+            self.rs, self.vs = keplerUniversalPropogate(self.y0[:, :3], self.y0[:, 3:], ts, self.body.mu)
+            return
+
+        if self.propogator == "dense":
+            self.__propogateDense__(n_steps)
+            return
+
+        if self.propogator in symplecticCoefficients:
+            self.rs = np.empty((self.nOrbits, n_steps, 3))
+            self.vs = np.empty((self.nOrbits, n_steps, 3))
+            for start, rs, vs in symplecticChunks(self.y0[:, :3], self.y0[:, 3:], n_steps, self.dt, self.body.mu, self.propogator, self.substeps):
+                self.rs[:, start:start + rs.shape[1]] = rs
+                self.vs[:, start:start + vs.shape[1]] = vs
+            return
+
+        ys = np.zeros((n_steps, self.nOrbits * 6))
+        ys[0] = self.y0.ravel()
+        step = 1
+
+        # Two-body motion is not stiff, so an explicit solver avoids LSODA building
+        # (6N x 6N) Jacobians. The error norm is taken over the whole stack, tighten
+        # the tolerance so every orbit is held to roughly what it would get on its own
+        solver = ode(self.__diffyQ__)
+        solver.set_integrator('dop853', rtol=1e-6 / np.sqrt(self.nOrbits), nsteps=500)
+        solver.set_initial_value(ys[0], 0)
+
+        while step < n_steps:
+            solver.integrate(solver.t + self.dt)
+            if not solver.successful():
+                break
+
+            ys[step] = solver.y
+            step += 1
+
+        # An orbit can collapse the shared step size and hold every other one back, or pass through the
+        # singularity at the centre without the stacked error norm noticing. Orbits whose energy drifts
+        # are continued from their last good step on their own solver, all of them if the solver failed
+        states = ys[:step].reshape(step, self.nOrbits, 6)
+        energy = 0.5 * np.sum(states[:, :, 3:]**2, axis=2) - self.body.mu / np.linalg.norm(states[:, :, :3], axis=2)
+        drifted = np.abs(energy - energy[0]) > self.energyTolerance * self.body.mu / np.linalg.norm(self.y0[:, :3], axis=1)
+        ends = np.where(drifted.any(axis=0), drifted.argmax(axis=0), step)
+
+        if np.any(ends < n_steps):
+            print("Batch propogation failed for {} of {} orbits, finishing them one at a time".format(np.count_nonzero(ends < n_steps), self.nOrbits))
+            self.failed = True
+
+        for index in np.flatnonzero(ends < n_steps):
+            self.filled[index] = self.__finishOrbit__(ys[:, index*6:(index + 1)*6], ends[index])
+            ys[self.filled[index]:, index*6:(index + 1)*6] = np.nan
+
+        ys = ys.reshape(n_steps, self.nOrbits, 6).transpose(1, 0, 2)
+        self.rs = ys[:, :, :3]
+        self.vs = ys[:, :, 3:]
+
+
+    def __finishOrbit__(self, ys: np.array, start: int) -> int:
+        ''' Continues one orbit's (n_steps, 6) states from row start - 1 with LSODA, returns the steps filled'''
+        solver = ode(self.__diffyQ__)
+        solver.set_integrator('lsoda')
+        solver.set_initial_value(ys[start - 1], (start - 1) * self.dt)
+
+        step = start
+        while step < len(ys):
+            solver.integrate(solver.t + self.dt)
+            if not solver.successful():
+                break
+
+            ys[step] = solver.y
+            step += 1
+
+        return step
+
+
+    def __propogateDense__(self, n_steps: int):
+        ts = np.arange(n_steps) * self.dt
+
+        sol = solve_ivp(self.__diffyQ__, (0, max(ts[-1], self.dt)), self.y0.ravel(), method='DOP853',
+                        dense_output=True, rtol=self.rtol / np.sqrt(self.nOrbits), atol=self.atol)
+
+        if not sol.success:
+            raise OrbitPropogationError(sol.message)
+
+        ys = sol.sol(ts).reshape(self.nOrbits, 6, n_steps).transpose(0, 2, 1)
+        self.rs = ys[:, :, :3]
+        self.vs = ys[:, :, 3:]
+
+
+    def __diffyQ__(self, t, y):
+        state = y.reshape(-1, 6)
+        r = state[:, :3]
 
+        norm_r = np.linalg.norm(r, axis=1)
 
+        dy = np.empty_like(state)
+        dy[:, :3] = state[:, 3:]
+        dy[:, 3:] = -r * (self.body.mu / norm_r**3)[:, np.newaxis]
 
+        return dy.ravel()
@@ -102,27 +102,416 @@ def coes2RvecVvec(annomoly: float, eccentricity: float, inclination: float, true
 
 
 
-def calculateEccentricAnomoly(me: float, e: float, method: str = "Newton", tolerance: float = 1e-8) -> float:
-    ''' Returns eccentric anomoly, if function fails returns None'''
-    if method == "Newton":
-        e0, e1 = 0
+def coes2RvecVvecArrays(semiMajorAxis: np.array, eccentricity: np.array, inclination: np.array, trueAnomaly: np.array,
+                        argOfPerig: np.array, raan: np.array, deg: bool = False, mu: float = plDat.Earth.mu) -> tuple:
+    '''
+        Converts arrays of classical orbital elements that broadcast together to (...,3) position and
+        velocity arrays. Hyperbolic orbits take a negative semi major axis
+    '''
+    a, e, i, nu, aop, raan = np.broadcast_arrays(*[np.asarray(value, dtype=float) for value in
+                                                  (semiMajorAxis, eccentricity, inclination, trueAnomaly, argOfPerig, raan)])
+    if deg:
+        i, nu, aop, raan = np.radians([i, nu, aop, raan])
 
-        if me < np.pi/2: e0 = me + e/2
-        else: e0 = me - e
+    # Perifocal state from the semi latus rectum
+    p = a * (1 - e**2)
+    cosNu, sinNu = np.cos(nu), np.sin(nu)
+    magR = p / (1 + e * cosNu)
+    speed = np.sqrt(mu / p)
+    xp, yp = magR * cosNu, magR * sinNu
+    vxp, vyp = -speed * sinNu, speed * (e + cosNu)
 
-        for n in range(200):
-            ratio = (e0 - e*np.sin(e0) - me) / (1 - e*np.cos(e0))
+    # Perifocal P and Q axes in the inertial frame, the first two columns of the perifocal to inertial rotation
+    cO, sO = np.cos(raan), np.sin(raan)
+    cw, sw = np.cos(aop), np.sin(aop)
+    ci, si = np.cos(i), np.sin(i)
+    P = np.stack([cO*cw - sO*sw*ci, sO*cw + cO*sw*ci, sw*si], axis=-1)
+    Q = np.stack([-cO*sw - sO*cw*ci, -sO*sw + cO*cw*ci, cw*si], axis=-1)
 
-            if abs(ratio) < tolerance:
-                if n == 0: return e0
-                else: return e1
+    rs = xp[..., np.newaxis] * P + yp[..., np.newaxis] * Q
+    vs = vxp[..., np.newaxis] * P + vyp[..., np.newaxis] * Q
+    return rs, vs
 
-            else:
-                e1 = e0 - ratio
-                e0 = 1
 
-        print("{} did not converge in calculating eccentric anomaly".format(method))
-        return None
+
+# Osculating elements, one row per state, angles in degrees or radians
+coesDtype = [("semiMajorAxis", float), ("eccentricity", float), ("inclination", float), ("raan", float),
+             ("argOfPerig", float), ("trueAnomaly", float), ("semiLatusRectum", float), ("magH", float)]
+
+
+
+def vectors2Coes(rs: np.array, vs: np.array, mu: float = plDat.Earth.mu, degrees: bool = True, tolerance: float = 1e-10) -> np.array:
+    '''
+        Osculating elements of (...,3) position and velocity arrays as a coesDtype array of shape (...).
+        Angles come from atan2 so every quadrant is resolved. Circular orbits measure the true anomaly
+        from the node (argument of latitude) and equatorial ones measure the argument of perigee from
+        the x axis, circular equatorial orbits give the true longitude
+    '''
+    rs = np.asarray(rs, dtype=float)
+    vs = np.asarray(vs, dtype=float)
+    magR = np.linalg.norm(rs, axis=-1)
+    magV2 = np.sum(vs * vs, axis=-1)
+    rDotV = np.sum(rs * vs, axis=-1)
+
+    hVec = np.cross(rs, vs)
+    magH = np.linalg.norm(hVec, axis=-1)
+    hHat = hVec / magH[..., np.newaxis]
+    nVec = np.stack([-hVec[..., 1], hVec[..., 0], np.zeros_like(magH)], axis=-1)
+    magN = np.linalg.norm(nVec, axis=-1)
+    eVec = ((magV2 - mu / magR)[..., np.newaxis] * rs - rDotV[..., np.newaxis] * vs) / mu
+    magE = np.linalg.norm(eVec, axis=-1)
+
+    circular = magE < tolerance
+    equatorial = magN < tolerance * magH
+
+    # Angles in the orbit plane measured from the node, or from the x axis for equatorial orbits
+    reference = np.where(equatorial[..., np.newaxis], [1.0, 0.0, 0.0], nVec / np.where(equatorial, 1, magN)[..., np.newaxis])
+    def planeAngle(fromVec, toVec):
+        return np.mod(np.arctan2(np.sum(np.cross(fromVec, toVec) * hHat, axis=-1), np.sum(fromVec * toVec, axis=-1)), 2*np.pi)
+
+    coes = np.empty(magR.shape, dtype=coesDtype)
+    coes["semiLatusRectum"] = magH**2 / mu
+    coes["semiMajorAxis"] = coes["semiLatusRectum"] / (1 - magE**2)
+    coes["eccentricity"] = magE
+    coes["magH"] = magH
+    coes["inclination"] = np.arccos(np.clip(hHat[..., 2], -1, 1))
+    coes["raan"] = np.where(equatorial, 0.0, np.mod(np.arctan2(nVec[..., 1], nVec[..., 0]), 2*np.pi))
+    coes["argOfPerig"] = np.where(circular, 0.0, planeAngle(reference, eVec))
+    coes["trueAnomaly"] = np.where(circular, planeAngle(reference, rs), planeAngle(eVec, rs))
+
+    if degrees:
+        for name in ("inclination", "raan", "argOfPerig", "trueAnomaly"):
+            coes[name] = np.degrees(coes[name])
+
+    return coes
+
+
+
+def stumpffFunctions(z: np.array) -> tuple:
+    ''' Returns the Stumpff functions C(z) and S(z) evaluated element wise'''
+    z = np.asarray(z, dtype=float)
+    c = np.empty_like(z)
+    s = np.empty_like(z)
+
+    pos = z > 1e-3
+    neg = z < -1e-3
+    small = ~(pos | neg)
+
+    sz = np.sqrt(z[pos])
+    c[pos] = (1 - np.cos(sz)) / z[pos]
+    s[pos] = (sz - np.sin(sz)) / sz**3
+
+    sz = np.sqrt(-z[neg])
+    c[neg] = (np.cosh(sz) - 1) / -z[neg]
+    s[neg] = (np.sinh(sz) - sz) / sz**3
+
+    # Series expansion avoids cancellation near z = 0 (parabolic)
+    zs = z[small]
+    c[small] = 1/2 - zs/24 + zs**2/720
+    s[small] = 1/6 - zs/120 + zs**2/5040
+
+    return c, s
+
+
+
+def keplerUniversalPropogate(r0: np.array, v0: np.array, ts: np.array, mu: float = plDat.Earth.mu, tolerance: float = 1e-10, maxIter: int = 50) -> tuple:
+    '''
+        Closed form two-body propogation using universal variables.
+        r0, v0 may be a single (3,) state or a stack of (N,3) states, ts is an array of times since epoch.
+        Returns position and velocity arrays of shape (T,3) or (N,T,3)
+    '''
+    r0 = np.asarray(r0, dtype=float)
+    v0 = np.asarray(v0, dtype=float)
+    single = r0.ndim == 1
+    r0 = np.atleast_2d(r0)[:, np.newaxis, :]    # (N,1,3)
+    v0 = np.atleast_2d(v0)[:, np.newaxis, :]
+    ts = np.asarray(ts, dtype=float)[np.newaxis, :]    # (1,T)
+
+    sqrtMu = np.sqrt(mu)
+    magR0 = np.linalg.norm(r0, axis=2)
+    rDotV = np.sum(r0 * v0, axis=2)
+    alpha = 2 / magR0 - np.sum(v0 * v0, axis=2) / mu     # 1 / semi-major axis
+
+    # Bound orbits repeat every period, reducing time keeps the universal anomaly small
+    dt = np.broadcast_to(ts, np.broadcast(ts, alpha).shape).copy()
+    ellip = np.broadcast_to(alpha > 1e-12, dt.shape)
+    period = 2 * np.pi / np.sqrt(mu * np.abs(alpha)**3)
+    period = np.broadcast_to(period, dt.shape)
+    dt[ellip] = np.fmod(dt[ellip], period[ellip])
+
+    alpha = np.broadcast_to(alpha, dt.shape)
+    magR0 = np.broadcast_to(magR0, dt.shape)
+    rDotV = np.broadcast_to(rDotV, dt.shape)
+
+    # Initial guess, Vallado Algorithm 8
+    chi = sqrtMu * dt / magR0
+    chi[ellip] = sqrtMu * dt[ellip] * alpha[ellip]
+    hyper = alpha < -1e-12
+    if np.any(hyper):
+        a = 1 / alpha[hyper]
+        sgn = np.sign(dt[hyper])
+        num = -2 * mu * alpha[hyper] * dt[hyper]
+        den = rDotV[hyper] + sgn * np.sqrt(-mu * a) * (1 - magR0[hyper] * alpha[hyper])
+        valid = (num * den > 0)
+        guess = chi[hyper]
+        guess[valid] = sgn[valid] * np.sqrt(-a[valid]) * np.log(num[valid] / den[valid])
+        chi[hyper] = guess
+
+    # Newton iterations on the universal Kepler equation, converged elements are masked out
+    active = np.ones(dt.shape, dtype=bool)
+    for n in range(maxIter):
+        x = chi[active]
+        z = alpha[active] * x**2
+        c, s = stumpffFunctions(z)
+        r0a = magR0[active]
+        rv = rDotV[active]
+
+        f = rv / sqrtMu * x**2 * c + (1 - alpha[active] * r0a) * x**3 * s + r0a * x - sqrtMu * dt[active]
+        df = rv / sqrtMu * x * (1 - z * s) + (1 - alpha[active] * r0a) * x**2 * c + r0a
+        ratio = f / df
+        chi[active] = x - ratio
+
+        done = np.abs(ratio) <= tolerance * np.maximum(1, np.abs(x))
+        active[active] = ~done
+        if not np.any(active):
+            break
+
+    if np.any(active):
+        raise OrbitPropogationError("Universal variable Kepler solution did not converge")
+
+    z = alpha * chi**2
+    c, s = stumpffFunctions(z)
+
+    # Lagrange coefficients
+    f = 1 - chi**2 / magR0 * c
+    g = dt - chi**3 / sqrtMu * s
+    rs = f[..., np.newaxis] * r0 + g[..., np.newaxis] * v0
+    magR = np.linalg.norm(rs, axis=2)
+
+    fDot = sqrtMu / (magR * magR0) * (z * s - 1) * chi
+    gDot = 1 - chi**2 / magR * c
+    vs = fDot[..., np.newaxis] * r0 + gDot[..., np.newaxis] * v0
+
+    if single:
+        return rs[0], vs[0]
+
+    return rs, vs
+
+
+
+def solveKepler(meanAnomaly: np.array, eccentricity: np.array, tolerance: float = 1e-12, maxIter: int = 50) -> np.array:
+    '''
+        Eccentric anomaly (e < 1) or hyperbolic anomaly (e > 1) in radians for mean anomalies and
+        eccentricities that broadcast together. Halley iterations run only on the elements that have not
+        converged, elements that fail to converge or are parabolic come back as NaN
+    '''
+    meanAnomaly, eccentricity = np.broadcast_arrays(np.asarray(meanAnomaly, dtype=float), np.asarray(eccentricity, dtype=float))
+    M = meanAnomaly.ravel()
+    e = eccentricity.ravel()
+    hyper = e > 1
+    ellip = (e >= 0) & (e < 1)
+
+    # Elliptic anomalies are solved within one revolution, the whole turns are added back at the end
+    turns = np.where(ellip, M - (np.mod(M + np.pi, 2*np.pi) - np.pi), 0)
+    M = M - turns
+
+    # Starters, Danby for ellipses and a logarithmic one for hyperbolas
+    anomaly = np.full(M.shape, np.nan)
+    anomaly[ellip] = M[ellip] + 0.85 * e[ellip] * np.sign(np.sin(M[ellip]))
+    anomaly[hyper] = np.sign(M[hyper]) * np.log(2 * np.abs(M[hyper]) / e[hyper] + 1.8)
+
+    active = ellip | hyper
+    for n in range(maxIter):
+        x = anomaly[active]
+        ea = e[active]
+        isHyper = hyper[active]
+
+        sinX = np.where(isHyper, np.sinh(x), np.sin(x))
+        cosX = np.where(isHyper, np.cosh(x), np.cos(x))
+        f = np.where(isHyper, ea * sinX - x, x - ea * sinX) - M[active]
+        df = np.where(isHyper, ea * cosX - 1, 1 - ea * cosX)
+        d2f = ea * sinX
+        ratio = f / (df - 0.5 * f * d2f / df)
+        anomaly[active] = x - ratio
+
+        done = np.abs(ratio) <= tolerance * np.maximum(1, np.abs(x))
+        active[active] = ~done
+        if not np.any(active):
+            break
+
+    anomaly[active] = np.nan
+    return (anomaly + turns).reshape(meanAnomaly.shape)
+
+
+
+def lambertUniversal(r1: np.array, r2: np.array, tof: np.array, mu: float = plDat.Sun.mu, prograde: bool = True,
+                     tolerance: float = 1e-10, maxIter: int = 100) -> tuple:
+    '''
+        Solves Lambert's problem (zero revolutions) with universal variables for whole arrays at once.
+        r1, r2 are (...,3) positions and tof the (...) times of flight in seconds, all broadcast together.
+        Returns the (...,3) departure and arrival velocities, cells without a solution are NaN
+    '''
+    r1 = np.asarray(r1, dtype=float)
+    r2 = np.asarray(r2, dtype=float)
+    tof = np.asarray(tof, dtype=float)
+    shape = np.broadcast_shapes(r1.shape[:-1], r2.shape[:-1], tof.shape)
+    r1 = np.broadcast_to(r1, shape + (3,))
+    r2 = np.broadcast_to(r2, shape + (3,))
+    tof = np.broadcast_to(tof, shape)
+
+    magR1 = np.linalg.norm(r1, axis=-1)
+    magR2 = np.linalg.norm(r2, axis=-1)
+    cosDnu = np.clip(np.sum(r1 * r2, axis=-1) / (magR1 * magR2), -1, 1)
+    crossZ = r1[..., 0] * r2[..., 1] - r1[..., 1] * r2[..., 0]
+
+    # Transfer angle follows the direction of motion
+    dnu = np.arccos(cosDnu)
+    longWay = crossZ < 0 if prograde else crossZ >= 0
+    dnu = np.where(longWay, 2*np.pi - dnu, dnu)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        A = np.sin(dnu) * np.sqrt(magR1 * magR2 / (1 - cosDnu))
+
+    sqrtMu = np.sqrt(mu)
+
+    def timeOfFlight(z):
+        c, s = stumpffFunctions(z)
+        y = magR1 + magR2 + A * (z * s - 1) / np.sqrt(c)
+        with np.errstate(invalid='ignore'):
+            t = ((y / c)**1.5 * s + A * np.sqrt(y)) / sqrtMu
+
+        # Negative y means z is below the smallest feasible value for this geometry
+        return np.where(y < 0, -np.inf, t), y
+
+    # Time of flight grows monotonically with z between these bounds, bisect every cell together
+    zLow = np.full(shape, -4 * np.pi**2)
+    zHigh = np.full(shape, 4 * np.pi**2 - 1e-9)
+    for n in range(maxIter):
+        z = 0.5 * (zLow + zHigh)
+        t, _ = timeOfFlight(z)
+        below = t < tof
+        zLow = np.where(below, z, zLow)
+        zHigh = np.where(below, zHigh, z)
+        if np.all(zHigh - zLow < tolerance):
+            break
+
+    z = 0.5 * (zLow + zHigh)
+    t, y = timeOfFlight(z)
+
+    # Lagrange coefficients
+    with np.errstate(divide='ignore', invalid='ignore'):
+        f = 1 - y / magR1
+        g = A * np.sqrt(y / mu)
+        gDot = 1 - y / magR2
+        v1 = (r2 - f[..., np.newaxis] * r1) / g[..., np.newaxis]
+        v2 = (gDot[..., np.newaxis] * r2 - r1) / g[..., np.newaxis]
+        failed = ~(np.abs(t - tof) <= 1e-6 * tof) | ~np.isfinite(A)
+
+    v1[failed] = np.nan
+    v2[failed] = np.nan
+    return v1, v2
+
+
+
+def julianDate(year, month, day, hour=0, minute=0, second=0) -> np.array:
+    ''' Julian date of a Gregorian calendar date, valid from 1900 to 2100. Accepts arrays'''
+    year = np.asarray(year)
+    month = np.asarray(month)
+    return 367 * year - (7 * (year + (month + 9) // 12)) // 4 + (275 * month) // 9 + np.asarray(day) + 1721013.5 \
+        + ((np.asarray(second) / 60 + np.asarray(minute)) / 60 + np.asarray(hour)) / 24
+
+
+
+def greenwichSiderealTime(julianDates: np.array) -> np.array:
+    ''' Greenwich mean sidereal time in radians (IAU 1982 model) for UT1 julian dates'''
+    centuries = (np.asarray(julianDates, dtype=float) - plDat.J2000) / 36525
+    seconds = 67310.54841 + (876600 * 3600 + 8640184.812866) * centuries + 0.093104 * centuries**2 - 6.2e-6 * centuries**3
+    return np.mod(np.radians(seconds / 240), 2*np.pi)
+
+
+
+def eci2Ecef(rs: np.array, julianDates: np.array) -> np.array:
+    ''' Rotates (...,T,3) inertial positions into the Earth fixed frame at the (T,) julian dates'''
+    rs = np.asarray(rs, dtype=float)
+    theta = greenwichSiderealTime(julianDates)
+    c, s = np.cos(theta), np.sin(theta)
+
+    ecef = np.empty_like(rs)
+    ecef[..., 0] = c * rs[..., 0] + s * rs[..., 1]
+    ecef[..., 1] = -s * rs[..., 0] + c * rs[..., 1]
+    ecef[..., 2] = rs[..., 2]
+    return ecef
+
+
+
+def groundTrack(rs: np.array, ts: np.array, epoch: float) -> tuple:
+    '''
+        Geocentric latitude and longitude in degrees below (...,T,3) inertial positions sampled at
+        ts seconds after the epoch julian date. Longitudes are wrapped to [-180, 180)
+    '''
+    ecef = eci2Ecef(rs, epoch + np.asarray(ts, dtype=float) / 86400)
+    latitude = np.degrees(np.arctan2(ecef[..., 2], np.hypot(ecef[..., 0], ecef[..., 1])))
+    longitude = np.degrees(np.arctan2(ecef[..., 1], ecef[..., 0]))
+    return latitude, longitude
+
+
+
+def splitDateline(latitude: np.array, longitude: np.array) -> tuple:
+    ''' Inserts NaN breaks where a (T,) ground track wraps across the dateline so plots do not streak across the map'''
+    jumps = np.flatnonzero(np.abs(np.diff(longitude)) > 180) + 1
+    return np.insert(np.asarray(latitude, dtype=float), jumps, np.nan), np.insert(np.asarray(longitude, dtype=float), jumps, np.nan)
+
+
+
+def planetEphemeris(body: plDat.base, julianDates: np.array, mu: float = plDat.Sun.mu) -> tuple:
+    '''
+        Heliocentric position (km) and velocity (km/s) of a planet in the J2000 ecliptic frame from
+        its mean elements. Returns (T,3) arrays for an array of julian dates
+    '''
+    if getattr(body, "ephemeris", None) is None:
+        raise InvalidParams("No ephemeris available for {}".format(body.name))
+
+    julianDates = np.atleast_1d(np.asarray(julianDates, dtype=float))
+    centuries = (julianDates - plDat.J2000) / 36525
+    elements, rates = (np.asarray(value, dtype=float) for value in body.ephemeris)
+    a, e, inc, meanLong, longPeri, raan = (elements[:, np.newaxis] + rates[:, np.newaxis] * centuries).reshape(6, -1)
+
+    a = a * plDat.AU
+    inc, meanLong, longPeri, raan = np.radians([inc, meanLong, longPeri, raan])
+    argOfPerig = longPeri - raan
+    meanAnomaly = np.mod(meanLong - longPeri + np.pi, 2*np.pi) - np.pi
+
+    E = solveKepler(meanAnomaly, e)
+
+    # Perifocal state
+    b = a * np.sqrt(1 - e**2)
+    eDot = np.sqrt(mu / a**3) / (1 - e * np.cos(E))
+    xp, yp = a * (np.cos(E) - e), b * np.sin(E)
+    vxp, vyp = -a * np.sin(E) * eDot, b * np.cos(E) * eDot
+
+    # Rotate by argument of perihelion, inclination and raan into the ecliptic frame
+    cO, sO = np.cos(raan), np.sin(raan)
+    cw, sw = np.cos(argOfPerig), np.sin(argOfPerig)
+    ci, si = np.cos(inc), np.sin(inc)
+    px, py, pz = cO*cw - sO*sw*ci, sO*cw + cO*sw*ci, sw*si
+    qx, qy, qz = -cO*sw - sO*cw*ci, -sO*sw + cO*cw*ci, cw*si
+
+    rs = np.stack([px*xp + qx*yp, py*xp + qy*yp, pz*xp + qz*yp], axis=-1)
+    vs = np.stack([px*vxp + qx*vyp, py*vxp + qy*vyp, pz*vxp + qz*vyp], axis=-1)
+    return rs, vs
+
+
+
+def calculateEccentricAnomoly(me: float, e: float, method: str = "Newton", tolerance: float = 1e-8) -> float:
+    ''' Returns eccentric anomoly, if function fails returns None'''
+    if method == "Newton":
+        anomaly = solveKepler(me, e, tolerance)
+
+        if np.isnan(anomaly):
+            print("{} did not converge in calculating eccentric anomaly".format(method))
+            return None
+
+        return float(anomaly)
 
     elif method == 'tae':
         return 2 * math.atan(math.sqrt((1 - e) / (1+e)) * math.tan(me / 2))
@@ -138,6 +527,13 @@ class CoordinateTransforms:
     validFrames = ["Inertial -> Perifocal", "Perifocal -> Inertial", "Perifocal -> Geocentric", "Geocentric -> Perifocal", 
                 "Topocentric-Horizon -> Geocentric", "Geocentric -> Topocentric-Horizon"]
 
+    arrayTransforms = {"Inertial -> Perifocal": "getInertial2PerifocalTransforms",
+                       "Perifocal -> Inertial": "getPerifocal2InertialTransforms",
+                       "Perifocal -> Geocentric": "getPerifcoal2GeocentricTransforms",
+                       "Geocentric -> Perifocal": "getGeocentric2PerifocalTransforms",
+                       "Topocentric-Horizon -> Geocentric": "getTopoHorizon2GeocentricTransforms",
+                       "Geocentric -> Topocentric-Horizon": "getGeocentric2TopoHorizonTransforms"}
+
     @staticmethod
     def getInertial2PerifocalTransform(raan: float, aop: float, inclination: float) -> np.array:
         i = inclination
@@ -170,7 +566,7 @@ class CoordinateTransforms:
 
         row2 = [math.sin(raan)*math.cos(aop) + math.cos(raan)*math.sin(aop)*math.cos(i),
                 -math.sin(raan)*math.sin(aop) + math.cos(raan)*math.cos(aop)*math.cos(i),
-                -math.cos(raan)*math.cos(i)]
+                -math.cos(raan)*math.sin(i)]
 
         row3 = [math.sin(aop)*math.sin(i), math.cos(aop)*math.sin(i), math.cos(i)]
 
@@ -199,6 +595,74 @@ class CoordinateTransforms:
         return np.transpose(CoordinateTransforms.getTopoHorizon2Geocentric(latitude, localSideRealTime))
 
 
+    # Array variants, angles broadcast together and each sine and cosine is taken once per element.
+    # They return (...,3,3) stacks of the same matrices as the single versions above
+
+    @staticmethod
+    def getInertial2PerifocalTransforms(raan: np.array, aop: np.array, inclination: np.array) -> np.array:
+        cO, sO = np.cos(raan), np.sin(raan)
+        cw, sw = np.cos(aop), np.sin(aop)
+        ci, si = np.cos(inclination), np.sin(inclination)
+        return CoordinateTransforms.__stackMatrices__([[-sO*ci*sw + cO*cw, cO*ci*sw + sO*cw, si*sw],
+                                                       [-sO*ci*cw - cO*sw, cO*ci*cw - sO*sw, si*cw],
+                                                       [sO*si, -cO*si, ci]])
+
+
+    @staticmethod
+    def getPerifocal2InertialTransforms(raan: np.array, aop: np.array, inclination: np.array) -> np.array:
+        return np.swapaxes(CoordinateTransforms.getInertial2PerifocalTransforms(raan, aop, inclination), -1, -2)
+
+
+    @staticmethod
+    def getPerifcoal2GeocentricTransforms(raan: np.array, argOfPerig: np.array, inclination: np.array) -> np.array:
+        return CoordinateTransforms.getPerifocal2InertialTransforms(raan, argOfPerig, inclination)
+
+
+    @staticmethod
+    def getGeocentric2PerifocalTransforms(raan: np.array, argOfPerig: np.array, inclination: np.array) -> np.array:
+        return CoordinateTransforms.getInertial2PerifocalTransforms(raan, argOfPerig, inclination)
+
+
+    @staticmethod
+    def getTopoHorizon2GeocentricTransforms(latitude: np.array, localSideRealTime: np.array) -> np.array:
+        cLat, sLat = np.cos(latitude), np.sin(latitude)
+        cLst, sLst = np.cos(localSideRealTime), np.sin(localSideRealTime)
+        return CoordinateTransforms.__stackMatrices__([[sLat*cLst, sLat*sLst, -cLat],
+                                                       [-sLst, cLst, 0.0],
+                                                       [cLat*cLst, cLat*sLst, sLat]])
+
+
+    @staticmethod
+    def getGeocentric2TopoHorizonTransforms(latitude: np.array, localSideRealTime: np.array) -> np.array:
+        return np.swapaxes(CoordinateTransforms.getTopoHorizon2GeocentricTransforms(latitude, localSideRealTime), -1, -2)
+
+
+    @staticmethod
+    def applyTransforms(matrices: np.array, vectors: np.array) -> np.array:
+        ''' Rotates (...,3) vectors by (...,3,3) matrices, one matrix per vector or one for all'''
+        return np.einsum('...ij,...j->...i', matrices, vectors)
+
+
+    @staticmethod
+    def transformVectors(frame: str, vectors: np.array, *angles) -> np.array:
+        '''
+            Builds the stack for one of validFrames from arrays of (raan, aop, inclination) or
+            (latitude, lst) and applies it to matching (...,3) vectors in one call
+        '''
+        if frame not in CoordinateTransforms.arrayTransforms:
+            raise InvalidParams("{} transform not supported".format(frame))
+
+        method = getattr(CoordinateTransforms, CoordinateTransforms.arrayTransforms[frame])
+        return CoordinateTransforms.applyTransforms(method(*angles), vectors)
+
+
+    @staticmethod
+    def __stackMatrices__(rows: list) -> np.array:
+        ''' Broadcasts nine matrix entries together into a (...,3,3) stack'''
+        entries = np.broadcast_arrays(*[np.asarray(entry, dtype=float) for row in rows for entry in row])
+        return np.stack(entries, axis=-1).reshape(entries[0].shape + (3, 3))
+
+
         
 
             
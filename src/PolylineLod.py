@@ -0,0 +1,40 @@
+import numpy as np
+
+
+def decimatePolyline(points: np.array, tolerance: float) -> np.array:
+    '''
+        Curvature adaptive decimation of an (n,3) polyline. A chord spanning length L of a curve with
+        curvature k sags about k*L^2/8 from it, so vertices are kept at equal steps of the integral of
+        sqrt(k) ds to hold the sag near tolerance. Straight runs collapse to their end points
+    '''
+    points = np.asarray(points)
+    if len(points) < 3 or tolerance <= 0:
+        return points
+
+    segments = np.diff(points, axis=0).astype(float)
+    lengths = np.linalg.norm(segments, axis=1)
+
+    # Turning angle and curvature at each interior vertex
+    norms = lengths[:-1] * lengths[1:]
+    cosines = np.einsum('ij,ij->i', segments[:-1], segments[1:]) / np.where(norms > 0, norms, 1)
+    angles = np.arccos(np.clip(cosines, -1, 1))
+    spans = 0.5 * (lengths[:-1] + lengths[1:])
+    curvature = np.hstack([0, angles / np.where(spans > 0, spans, 1), 0])
+
+    # Each segment contributes sqrt of its mean end point curvature times its length
+    measure = np.sqrt(0.5 * (curvature[:-1] + curvature[1:])) * lengths
+    cumulative = np.hstack([0, np.cumsum(measure)])
+
+    nSegments = int(np.ceil(cumulative[-1] / np.sqrt(8 * tolerance)))
+    if nSegments < 1:
+        return points[[0, -1]]
+
+    targets = np.linspace(0, cumulative[-1], nSegments + 1)
+    keep = np.unique(np.hstack([0, np.searchsorted(cumulative, targets), len(points) - 1]))
+    keep = keep[keep < len(points)]
+    return points[keep]
+
+
+def buildLevelsOfDetail(points: np.array, tolerances: list) -> list:
+    ''' Returns one decimated polyline per tolerance, finest first'''
+    return [np.ascontiguousarray(decimatePolyline(points, tolerance)) for tolerance in sorted(tolerances)]
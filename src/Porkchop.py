@@ -0,0 +1,75 @@
+import numpy as np
+
+from .planetary_data import planetaryData as plDat
+from .OrbitTools import lambertUniversal, planetEphemeris, InvalidParams
+
+
+class Porkchop():
+    '''
+        Departure C3 and arrival v infinity of direct transfers between two planets over a grid of
+        departure and arrival dates. Every cell is solved in one vectorized Lambert call
+    '''
+    def __init__(self, departureBody: plDat.base, arrivalBody: plDat.base, departureDates: np.array, arrivalDates: np.array,
+                 prograde: bool = True) -> None:
+        self.departureBody = departureBody
+        self.arrivalBody = arrivalBody
+        self.departureDates = np.asarray(departureDates, dtype=float)     # Julian dates
+        self.arrivalDates = np.asarray(arrivalDates, dtype=float)
+        self.prograde = prograde
+        self.c3 = None              # (nArrival, nDeparture) km^2/s^2
+        self.vInfArrival = None     # (nArrival, nDeparture) km/s
+        self.tof = None             # (nArrival, nDeparture) days
+
+        if departureBody is arrivalBody:
+            raise InvalidParams("Departure and arrival bodies must differ")
+
+
+    @staticmethod
+    def fromSpans(departureBody: plDat.base, arrivalBody: plDat.base, departureStart: float, departureDays: float,
+                  arrivalStart: float, arrivalDays: float, nDeparture: int = 500, nArrival: int = 500) -> 'Porkchop':
+        ''' Builds an evenly spaced grid from the first julian date and length in days of each window'''
+        return Porkchop(departureBody, arrivalBody, np.linspace(departureStart, departureStart + departureDays, nDeparture),
+                        np.linspace(arrivalStart, arrivalStart + arrivalDays, nArrival))
+
+
+    def compute(self) -> None:
+        r1, planetV1 = planetEphemeris(self.departureBody, self.departureDates)
+        r2, planetV2 = planetEphemeris(self.arrivalBody, self.arrivalDates)
+
+        self.tof = self.arrivalDates[:, np.newaxis] - self.departureDates[np.newaxis, :]
+        tofSeconds = np.where(self.tof > 0, self.tof * 86400, np.nan)
+
+        v1, v2 = lambertUniversal(r1[np.newaxis], r2[:, np.newaxis], tofSeconds, plDat.Sun.mu, self.prograde)
+
+        self.c3 = np.sum((v1 - planetV1[np.newaxis])**2, axis=-1)
+        self.vInfArrival = np.linalg.norm(v2 - planetV2[:, np.newaxis], axis=-1)
+
+
+    def getMinimumC3(self) -> tuple:
+        ''' Returns (departure date, arrival date, C3) of the cheapest departure'''
+        index = np.unravel_index(np.nanargmin(self.c3), self.c3.shape)
+        return self.departureDates[index[1]], self.arrivalDates[index[0]], self.c3[index]
+
+
+    def plot(self, ax, levels: np.array = None) -> None:
+        ''' Draws C3 and time of flight contours against days from the first departure and arrival dates'''
+        if self.c3 is None:
+            print("Error No porkchop data to plot")
+            return
+
+        if levels is None:
+            cMin = np.nanmin(self.c3)
+            levels = np.linspace(cMin, cMin * 4 + 1, 12)
+
+        x = self.departureDates - self.departureDates[0]
+        y = self.arrivalDates - self.arrivalDates[0]
+        c3Contours = ax.contour(x, y, self.c3, levels=levels, cmap="viridis")
+        ax.clabel(c3Contours, fmt="%.1f", fontsize=7)
+        tofContours = ax.contour(x, y, self.tof, colors="gray", linewidths=0.5)
+        ax.clabel(tofContours, fmt="%d d", fontsize=6)
+
+        depDate, arrDate, c3 = self.getMinimumC3()
+        ax.plot([depDate - self.departureDates[0]], [arrDate - self.arrivalDates[0]], "r*")
+        ax.set_xlabel("Days after departure JD {:.1f}".format(self.departureDates[0]))
+        ax.set_ylabel("Days after arrival JD {:.1f}".format(self.arrivalDates[0]))
+        ax.set_title("{} to {} C3 (km^2/s^2), min {:.2f}".format(self.departureBody.name, self.arrivalBody.name, c3))
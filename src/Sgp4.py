@@ -0,0 +1,687 @@
+import numpy as np
+
+from .OrbitTools import julianDate, greenwichSiderealTime, InvalidParams
+
+
+# WGS-72 constants the element sets are fitted with
+EARTH_RADIUS = 6378.135         # km
+EARTH_MU = 398600.8             # km^3/s^2
+XKE = 60.0 / np.sqrt(EARTH_RADIUS**3 / EARTH_MU)    # sqrt(mu) in earth radii^1.5 / min
+J2 = 0.001082616
+J3 = -0.00000253881
+J4 = -0.00000165597
+J3OJ2 = J3 / J2
+MINUTES_PER_DAY = 1440.0
+DEEP_SPACE_PERIOD = 225.0       # min, longer periods need the SDP4 lunar / solar terms
+
+# Deep space (SDP4) perturbers, mean motions in rad/min
+SOLAR_MOTION = 1.19459e-5
+SOLAR_ECCENTRICITY = 0.01675
+LUNAR_MOTION = 1.5835218e-4
+LUNAR_ECCENTRICITY = 0.05490
+EARTH_ROTATION = 4.37526908801129966e-3     # rad/min
+RESONANCE_STEP = 720.0          # min, integration step of the 12 and 24 hour resonances
+
+
+# One row per element set, angles in degrees and mean motion in rev/day as printed on the cards
+tleDtype = [("name", "U64"), ("satnum", int), ("epoch", float), ("ndot", float), ("nddot", float), ("bstar", float),
+            ("inclination", float), ("raan", float), ("eccentricity", float), ("argOfPerig", float),
+            ("meanAnomaly", float), ("meanMotion", float)]
+
+
+
+def tleChecksum(line: str) -> int:
+    ''' Modulo 10 checksum of the first 68 columns, digits count their value and minus signs count one'''
+    return sum(int(c) if c.isdigit() else c == '-' for c in line[:68]) % 10
+
+
+
+def catalogNumber(field: str) -> int:
+    ''' Catalog number of a card, Alpha-5 numbers replace the leading digit with a letter skipping I and O'''
+    field = field.strip()
+    if field[:1].isalpha():
+        return ("ABCDEFGHJKLMNPQRSTUVWXYZ".index(field[0].upper()) + 10) * 10000 + int(field[1:])
+
+    return int(field)
+
+
+
+def __impliedDecimal__(field: str) -> float:
+    ''' Parses the assumed decimal point fields of a TLE, " 12345-4" is 0.12345e-4'''
+    field = field.strip()
+    if not field:
+        return 0.0
+
+    mantissa, exponent = field[:-2], int(field[-2:])
+    sign = -1.0 if mantissa.startswith('-') else 1.0
+    return sign * float("0." + mantissa.lstrip("+-")) * 10.0**exponent
+
+
+
+def parseTle(line1: str, line2: str, name: str = "") -> tuple:
+    ''' Returns one tleDtype row from the two card lines, raises InvalidParams on a malformed or corrupted set'''
+    line1, line2 = line1.rstrip(), line2.rstrip()
+    if len(line1) < 69 or len(line2) < 69 or line1[0] != '1' or line2[0] != '2':
+        raise InvalidParams("Malformed TLE lines")
+
+    for line in (line1, line2):
+        if not line[68].isdigit() or tleChecksum(line) != int(line[68]):
+            raise InvalidParams("TLE checksum failed for {}".format(line[2:7].strip()))
+
+    try:
+        year = int(line1[18:20])
+        year += 2000 if year < 57 else 1900
+        epoch = julianDate(year, 1, 1) + float(line1[20:32]) - 1
+
+        return (name.strip() or line1[2:7].strip(), catalogNumber(line1[2:7]), float(epoch), float(line1[33:43]),
+                __impliedDecimal__(line1[44:52]), __impliedDecimal__(line1[53:61]),
+                float(line2[8:16]), float(line2[17:25]), float("0." + line2[26:33].strip()), float(line2[34:42]),
+                float(line2[43:51]), float(line2[52:63]))
+
+    except ValueError:
+        raise InvalidParams("Malformed TLE fields for {}".format(line1[2:7].strip()))
+
+
+
+def parseTleLines(lines) -> np.array:
+    '''
+        Parses two or three line element sets from an iterable of lines into a tleDtype array.
+        Corrupted sets are reported and skipped
+    '''
+    rows = []
+    name = ""
+    pending = None
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if not line.strip():
+            continue
+
+        if line.startswith("1 ") and pending is None:
+            pending = line
+        elif line.startswith("2 ") and pending is not None:
+            try:
+                rows.append(parseTle(pending, line, name))
+            except InvalidParams as error:
+                print("Skipping TLE: {}".format(error))
+            name, pending = "", None
+        else:
+            name, pending = line[2:] if line.startswith("0 ") else line, None
+
+    return np.array(rows, dtype=tleDtype)
+
+
+
+def readTleFile(path: str) -> np.array:
+    with open(path, "r") as file:
+        return parseTleLines(file)
+
+
+
+class Sgp4Propogator():
+    '''
+        SGP4 / SDP4 propogation of a whole element set catalog, vectorized over satellites and times.
+        Positions (km) and velocities (km/s) are in the TEME frame of the element sets. Deep space objects
+        (periods of 225 minutes or more) add the lunar / solar periodics and the 12 and 24 hour resonances.
+        Decayed objects and times where the elements become invalid come back as NaN
+    '''
+    def __init__(self, elements: np.array, chunkSize: int = 1000000) -> None:
+        if len(elements) == 0:
+            raise InvalidParams("No element sets to propogate")
+
+        self.elements = elements
+        self.names = elements["name"]
+        self.epochs = elements["epoch"]
+        self.chunkSize = chunkSize      # satellite * time samples propogated together
+        self.coefficients = self.__initialize__()
+        self.deepSpace = self.coefficients["deepSpace"]
+
+
+    def getDeepSpaceMask(self) -> np.array:
+        return self.deepSpace
+
+
+    def propogate(self, julianDates: np.array) -> tuple:
+        ''' States of every satellite at the (T,) julian dates, returns (N,T,3) position and velocity arrays'''
+        julianDates = np.atleast_1d(np.asarray(julianDates, dtype=float))
+        return self.propogateSince((julianDates[np.newaxis, :] - self.epochs[:, np.newaxis]) * MINUTES_PER_DAY)
+
+
+    def propogateSince(self, minutes: np.array) -> tuple:
+        ''' States at (T,) or (N,T) minutes since each satellite's epoch, returns (N,T,3) arrays'''
+        minutes = np.broadcast_to(np.asarray(minutes, dtype=float), (len(self.elements), np.shape(minutes)[-1]))
+        nSats, nTimes = minutes.shape
+        rs = np.empty((nSats, nTimes, 3))
+        vs = np.empty((nSats, nTimes, 3))
+
+        step = max(self.chunkSize // max(nTimes, 1), 1)
+        for start in range(0, nSats, step):
+            chunk = slice(start, start + step)
+            coefficients = {key: value[chunk, np.newaxis] for key, value in self.coefficients.items()}
+            rs[chunk], vs[chunk] = self.__propogateChunk__(coefficients, minutes[chunk])
+
+        return rs, vs
+
+
+    def __initialize__(self) -> dict:
+        ''' Secular and drag coefficients of every satellite, the vectorized form of sgp4init'''
+        e = self.elements
+        ecco = e["eccentricity"]
+        inclo = np.radians(e["inclination"])
+        argpo = np.radians(e["argOfPerig"])
+        mo = np.radians(e["meanAnomaly"])
+        bstar = e["bstar"]
+        noKozai = e["meanMotion"] * 2*np.pi / MINUTES_PER_DAY
+
+        # Recover the original mean motion and semi major axis from the Kozai mean motion
+        omeosq = 1 - ecco**2
+        rteosq = np.sqrt(omeosq)
+        cosio = np.cos(inclo)
+        sinio = np.sin(inclo)
+        cosio2 = cosio**2
+        ak = (XKE / noKozai)**(2/3)
+        d1 = 0.75 * J2 * (3*cosio2 - 1) / (rteosq * omeosq)
+        delta = d1 / ak**2
+        adel = ak * (1 - delta**2 - delta * (1/3 + 134 * delta**2 / 81))
+        delta = d1 / adel**2
+        noUnkozai = noKozai / (1 + delta)
+        ao = (XKE / noUnkozai)**(2/3)
+        po = ao * omeosq
+        con42 = 1 - 5*cosio2
+        con41 = -con42 - 2*cosio2
+        posq = po**2
+        rp = ao * (1 - ecco)
+
+        # Low perigees use a lower atmosphere density fit
+        ss = 78 / EARTH_RADIUS + 1
+        qzms2t = ((120 - 78) / EARTH_RADIUS)**4
+        perigee = (rp - 1) * EARTH_RADIUS
+        sfour = np.where(perigee < 98, 20.0, perigee - 78)
+        qzms24 = np.where(perigee < 156, ((120 - sfour) / EARTH_RADIUS)**4, qzms2t)
+        sfour = np.where(perigee < 156, sfour / EARTH_RADIUS + 1, ss)
+        isimp = rp < 220 / EARTH_RADIUS + 1
+
+        pinvsq = 1 / posq
+        tsi = 1 / (ao - sfour)
+        eta = ao * ecco * tsi
+        etasq = eta**2
+        eeta = ecco * eta
+        psisq = np.abs(1 - etasq)
+        coef = qzms24 * tsi**4
+        coef1 = coef / psisq**3.5
+        cc2 = coef1 * noUnkozai * (ao * (1 + 1.5*etasq + eeta * (4 + etasq)) + 0.375 * J2 * tsi / psisq * con41
+                                   * (8 + 3 * etasq * (8 + etasq)))
+        cc1 = bstar * cc2
+        circular = ecco <= 1e-4
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cc3 = np.where(circular, 0.0, -2 * coef * tsi * J3OJ2 * noUnkozai * sinio / ecco)
+            xmcof = np.where(circular, 0.0, -2/3 * coef * bstar / eeta)
+
+        x1mth2 = 1 - cosio2
+        cc4 = 2 * noUnkozai * coef1 * ao * omeosq * (eta * (2 + 0.5*etasq) + ecco * (0.5 + 2*etasq) - J2 * tsi / (ao * psisq)
+                                                      * (-3 * con41 * (1 - 2*eeta + etasq * (1.5 - 0.5*eeta)) + 0.75 * x1mth2
+                                                         * (2*etasq - eeta * (1 + etasq)) * np.cos(2*argpo)))
+        cc5 = 2 * coef1 * ao * omeosq * (1 + 2.75 * (etasq + eeta) + eeta * etasq)
+
+        # Secular rates from J2 and J4
+        cosio4 = cosio2**2
+        temp1 = 1.5 * J2 * pinvsq * noUnkozai
+        temp2 = 0.5 * temp1 * J2 * pinvsq
+        temp3 = -0.46875 * J4 * pinvsq**2 * noUnkozai
+        mdot = noUnkozai + 0.5 * temp1 * rteosq * con41 + 0.0625 * temp2 * rteosq * (13 - 78*cosio2 + 137*cosio4)
+        argpdot = -0.5 * temp1 * con42 + 0.0625 * temp2 * (7 - 114*cosio2 + 395*cosio4) + temp3 * (3 - 36*cosio2 + 49*cosio4)
+        xhdot1 = -temp1 * cosio
+        nodedot = xhdot1 + (0.5 * temp2 * (4 - 19*cosio2) + 2 * temp3 * (3 - 7*cosio2)) * cosio
+
+        # Higher order drag terms, dropped for perigees under 220 km and for deep space objects
+        cc1sq = cc1**2
+        d2 = 4 * ao * tsi * cc1sq
+        temp = d2 * tsi * cc1 / 3
+        d3 = (17 * ao + sfour) * temp
+        d4 = 0.5 * temp * ao * tsi * (221 * ao + 31 * sfour) * cc1
+        t3cof = d2 + 2 * cc1sq
+        t4cof = 0.25 * (3 * d3 + cc1 * (12 * d2 + 10 * cc1sq))
+        t5cof = 0.2 * (3 * d4 + 12 * cc1 * d3 + 6 * d2**2 + 15 * cc1sq * (2 * d2 + cc1sq))
+        deepSpace = 2*np.pi / noUnkozai >= DEEP_SPACE_PERIOD
+        full = ~isimp & ~deepSpace
+
+        nodeo = np.radians(e["raan"])
+        coefficients = {"ecco": ecco, "inclo": inclo, "nodeo": nodeo, "argpo": argpo, "mo": mo, "bstar": bstar,
+                        "noUnkozai": noUnkozai, "eta": eta, "cc1": cc1, "cc4": cc4, "cc5": np.where(full, cc5, 0.0),
+                        "mdot": mdot, "argpdot": argpdot, "nodedot": nodedot,
+                        "omgcof": np.where(full, bstar * cc3 * np.cos(argpo), 0.0), "xmcof": np.where(full, xmcof, 0.0),
+                        "nodecf": 3.5 * omeosq * xhdot1 * cc1, "t2cof": 1.5 * cc1, "delmo": (1 + eta * np.cos(mo))**3,
+                        "sinmao": np.sin(mo), "d2": np.where(full, d2, 0.0), "d3": np.where(full, d3, 0.0),
+                        "d4": np.where(full, d4, 0.0), "t3cof": np.where(full, t3cof, 0.0),
+                        "t4cof": np.where(full, t4cof, 0.0), "t5cof": np.where(full, t5cof, 0.0), "deepSpace": deepSpace}
+
+        # Deep space terms are zero for near earth objects
+        d = deepSpace
+        deepTerms = self.__initializeDeepSpace__(self.epochs[d], ecco[d], inclo[d], nodeo[d], argpo[d], mo[d],
+                                                 noUnkozai[d], mdot[d], argpdot[d], nodedot[d])
+        for key, value in deepTerms.items():
+            coefficients[key] = np.zeros(len(e), dtype=value.dtype)
+            coefficients[key][d] = value
+
+        return coefficients
+
+
+    def __initializeDeepSpace__(self, epochs: np.array, ecco: np.array, inclo: np.array, nodeo: np.array,
+                                argpo: np.array, mo: np.array, noUnkozai: np.array, mdot: np.array,
+                                argpdot: np.array, nodedot: np.array) -> dict:
+        ''' Lunar / solar periodic, secular and resonance coefficients of deep space objects, dscom and dsinit'''
+        day = epochs - 2415020.0        # days since 1900 January 0.5
+        emsq = ecco**2
+        sinim, cosim = np.sin(inclo), np.cos(inclo)
+        snodm, cnodm = np.sin(nodeo), np.cos(nodeo)
+
+        # Orientation of the lunar orbit from the regression of its node
+        xnodce = np.mod(4.5236020 - 9.2422029e-4 * day, 2*np.pi)
+        stem, ctem = np.sin(xnodce), np.cos(xnodce)
+        zcosil = 0.91375164 - 0.03568096 * ctem
+        zsinil = np.sqrt(1 - zcosil**2)
+        zsinhl = 0.089683511 * stem / zsinil
+        zcoshl = np.sqrt(1 - zsinhl**2)
+        gam = 5.8351514 + 0.0019443680 * day
+        zx = gam + np.arctan2(0.39785416 * stem / zsinil, zcoshl * ctem + 0.91744867 * zsinhl * stem) - xnodce
+
+        orbit = (cosim, sinim, np.cos(argpo), np.sin(argpo), ecco, noUnkozai)
+        perturbers = {"solar": (SOLAR_MOTION, SOLAR_ECCENTRICITY,
+                                self.__perturberTerms__(0.1945905, -0.98088458, 0.91744867, 0.39785416, cnodm, snodm,
+                                                        2.9864797e-6, *orbit)),
+                      "lunar": (LUNAR_MOTION, LUNAR_ECCENTRICITY,
+                                self.__perturberTerms__(np.cos(zx), np.sin(zx), zcosil, zsinil, zcoshl * cnodm + zsinhl * snodm,
+                                                        snodm * zcoshl - cnodm * zsinhl, 4.7968065e-7, *orbit))}
+
+        # Periodic coefficients and the secular rates, node rates vanish for near equatorial orbits
+        terms = {"solarM0": np.mod(6.2565837 + 0.017201977 * day, 2*np.pi),
+                 "lunarM0": np.mod(4.7199672 + 0.22997150 * day - gam, 2*np.pi)}
+        equatorial = (inclo < 5.2359877e-2) | (inclo > np.pi - 5.2359877e-2)
+        dedt, didt, dmdt, dgh, dh = 0.0, 0.0, 0.0, 0.0, 0.0
+        for body, (motion, eccentricity, p) in perturbers.items():
+            terms.update({body + "E2": 2 * p["s1"] * p["s6"], body + "E3": 2 * p["s1"] * p["s7"],
+                          body + "I2": 2 * p["s2"] * p["z12"], body + "I3": 2 * p["s2"] * (p["z13"] - p["z11"]),
+                          body + "L2": -2 * p["s3"] * p["z2"], body + "L3": -2 * p["s3"] * (p["z3"] - p["z1"]),
+                          body + "L4": -2 * p["s3"] * (-21 - 9 * emsq) * eccentricity,
+                          body + "Gh2": 2 * p["s4"] * p["z32"], body + "Gh3": 2 * p["s4"] * (p["z33"] - p["z31"]),
+                          body + "Gh4": -18 * p["s4"] * eccentricity,
+                          body + "H2": -2 * p["s2"] * p["z22"], body + "H3": -2 * p["s2"] * (p["z23"] - p["z21"])})
+
+            dedt = dedt + p["s1"] * motion * p["s5"]
+            didt = didt + p["s2"] * motion * (p["z11"] + p["z13"])
+            dmdt = dmdt - motion * p["s3"] * (p["z1"] + p["z3"] - 14 - 6 * emsq)
+            dgh = dgh + p["s4"] * motion * (p["z31"] + p["z33"] - 6)
+            dh = dh + np.where(equatorial, 0.0, -motion * p["s2"] * (p["z21"] + p["z23"]))
+
+        dh = dh / np.where(sinim != 0, sinim, 1.0)
+        terms.update({"dedt": dedt, "didt": didt, "dmdt": dmdt, "domdt": dgh - cosim * dh, "dnodt": dh})
+
+        # Geopotential resonances, 24 hour synchronous and 12 hour eccentric semi synchronous orbits
+        irez = np.where((0.0034906585 < noUnkozai) & (noUnkozai < 0.0052359877), 1, 0)
+        irez = np.where((8.26e-3 <= noUnkozai) & (noUnkozai <= 9.24e-3) & (ecco >= 0.5), 2, irez)
+        gsto = greenwichSiderealTime(epochs)
+        aonv = (noUnkozai / XKE)**(2/3)
+        cosisq = cosim**2
+        sini2 = sinim**2
+        f220 = 0.75 * (1 + cosim)**2
+
+        em, eoc = ecco, ecco * emsq
+        low = em <= 0.65
+        g201 = -0.306 - (em - 0.64) * 0.440
+        g211 = np.where(low, 3.616 - 13.2470 * em + 16.2900 * emsq, -72.099 + 331.819 * em - 508.738 * emsq + 266.724 * eoc)
+        g310 = np.where(low, -19.302 + 117.3900 * em - 228.4190 * emsq + 156.5910 * eoc,
+                        -346.844 + 1582.851 * em - 2415.925 * emsq + 1246.113 * eoc)
+        g322 = np.where(low, -18.9068 + 109.7927 * em - 214.6334 * emsq + 146.5816 * eoc,
+                        -342.585 + 1554.908 * em - 2366.899 * emsq + 1215.972 * eoc)
+        g410 = np.where(low, -41.122 + 242.6940 * em - 471.0940 * emsq + 313.9530 * eoc,
+                        -1052.797 + 4758.686 * em - 7193.992 * emsq + 3651.957 * eoc)
+        g422 = np.where(low, -146.407 + 841.8800 * em - 1629.014 * emsq + 1083.4350 * eoc,
+                        -3581.690 + 16178.110 * em - 24462.770 * emsq + 12422.520 * eoc)
+        g520 = np.where(low, -532.114 + 3017.977 * em - 5740.032 * emsq + 3708.2760 * eoc,
+                        np.where(em > 0.715, -5149.66 + 29936.92 * em - 54087.36 * emsq + 31324.56 * eoc,
+                                 1464.74 - 4664.75 * em + 3763.64 * emsq))
+        low = em < 0.7
+        g533 = np.where(low, -919.22770 + 4988.6100 * em - 9064.7700 * emsq + 5542.21 * eoc,
+                        -37995.780 + 161616.52 * em - 229838.20 * emsq + 109377.94 * eoc)
+        g521 = np.where(low, -822.71072 + 4568.6173 * em - 8491.4146 * emsq + 5337.524 * eoc,
+                        -51752.104 + 218913.95 * em - 309468.16 * emsq + 146349.42 * eoc)
+        g532 = np.where(low, -853.66600 + 4690.2500 * em - 8624.7700 * emsq + 5341.4 * eoc,
+                        -40023.880 + 170470.89 * em - 242699.48 * emsq + 115605.82 * eoc)
+
+        f221 = 1.5 * sini2
+        f321 = 1.875 * sinim * (1 - 2 * cosim - 3 * cosisq)
+        f322 = -1.875 * sinim * (1 + 2 * cosim - 3 * cosisq)
+        f441 = 35 * sini2 * f220
+        f442 = 39.3750 * sini2**2
+        f522 = 9.84375 * sinim * (sini2 * (1 - 2 * cosim - 5 * cosisq) + 0.33333333 * (-2 + 4 * cosim + 6 * cosisq))
+        f523 = sinim * (4.92187512 * sini2 * (-2 - 4 * cosim + 10 * cosisq) + 6.56250012 * (1 + 2 * cosim - 3 * cosisq))
+        f542 = 29.53125 * sinim * (2 - 8 * cosim + cosisq * (-12 + 8 * cosim + 10 * cosisq))
+        f543 = 29.53125 * sinim * (-2 - 8 * cosim + cosisq * (12 + 8 * cosim - 10 * cosisq))
+
+        semiSynchronous = irez == 2
+        temp1 = 3 * noUnkozai**2 * aonv**2 * semiSynchronous
+        temp = temp1 * 1.7891679e-6
+        terms.update({"d2201": temp * f220 * g201, "d2211": temp * f221 * g211})
+        temp1 = temp1 * aonv
+        temp = temp1 * 3.7393792e-7
+        terms.update({"d3210": temp * f321 * g310, "d3222": temp * f322 * g322})
+        temp1 = temp1 * aonv
+        temp = 2 * temp1 * 7.3636953e-9
+        terms.update({"d4410": temp * f441 * g410, "d4422": temp * f442 * g422})
+        temp1 = temp1 * aonv
+        temp = temp1 * 1.1428639e-7
+        terms.update({"d5220": temp * f522 * g520, "d5232": temp * f523 * g532})
+        temp = 2 * temp1 * 2.1765803e-9
+        terms.update({"d5421": temp * f542 * g521, "d5433": temp * f543 * g533})
+
+        synchronous = irez == 1
+        g200 = 1 + emsq * (-2.5 + 0.8125 * emsq)
+        g300 = 1 + emsq * (-6 + 6.60937 * emsq)
+        f311 = 0.9375 * sini2 * (1 + 3 * cosim) - 0.75 * (1 + cosim)
+        f330 = 1.875 * (1 + cosim)**3
+        del1 = 3 * noUnkozai**2 * aonv**2 * synchronous
+        terms.update({"del1": del1 * f311 * (1 + 2 * emsq) * 2.1460748e-6 * aonv,
+                      "del2": 2 * del1 * f220 * g200 * 1.7891679e-6,
+                      "del3": 3 * del1 * f330 * g300 * 2.2123015e-7 * aonv})
+
+        terms["xlamo"] = np.where(semiSynchronous, np.mod(mo + 2 * nodeo - 2 * gsto, 2*np.pi),
+                                  np.mod(mo + nodeo + argpo - gsto, 2*np.pi))
+        terms["xfact"] = np.where(semiSynchronous, mdot + dmdt + 2 * (nodedot + terms["dnodt"] - EARTH_ROTATION) - noUnkozai,
+                                  mdot + argpdot + nodedot - EARTH_ROTATION + dmdt + terms["domdt"] + terms["dnodt"] - noUnkozai)
+        terms.update({"irez": irez, "gsto": gsto})
+        return terms
+
+
+    @staticmethod
+    def __perturberTerms__(zcosg, zsing, zcosi, zsini, zcosh, zsinh, cc, cosim, sinim, cosomm, sinomm, em, nm) -> dict:
+        ''' Geometry terms of the sun or moon acting on each orbit, one pass of the dscom perturber loop'''
+        emsq = em**2
+        betasq = 1 - emsq
+        rtemsq = np.sqrt(betasq)
+        a1 = zcosg * zcosh + zsing * zcosi * zsinh
+        a3 = -zsing * zcosh + zcosg * zcosi * zsinh
+        a7 = -zcosg * zsinh + zsing * zcosi * zcosh
+        a8 = zsing * zsini
+        a9 = zsing * zsinh + zcosg * zcosi * zcosh
+        a10 = zcosg * zsini
+        a2 = cosim * a7 + sinim * a8
+        a4 = cosim * a9 + sinim * a10
+        a5 = -sinim * a7 + cosim * a8
+        a6 = -sinim * a9 + cosim * a10
+
+        x1 = a1 * cosomm + a2 * sinomm
+        x2 = a3 * cosomm + a4 * sinomm
+        x3 = -a1 * sinomm + a2 * cosomm
+        x4 = -a3 * sinomm + a4 * cosomm
+        x5 = a5 * sinomm
+        x6 = a6 * sinomm
+        x7 = a5 * cosomm
+        x8 = a6 * cosomm
+
+        z31 = 12 * x1**2 - 3 * x3**2
+        z32 = 24 * x1 * x2 - 6 * x3 * x4
+        z33 = 12 * x2**2 - 3 * x4**2
+        z1 = 3 * (a1**2 + a2**2) + z31 * emsq
+        z2 = 6 * (a1 * a3 + a2 * a4) + z32 * emsq
+        z3 = 3 * (a3**2 + a4**2) + z33 * emsq
+        s3 = cc / nm
+        s4 = s3 * rtemsq
+        return {"z1": 2 * z1 + betasq * z31, "z2": 2 * z2 + betasq * z32, "z3": 2 * z3 + betasq * z33,
+                "z11": -6 * a1 * a5 + emsq * (-24 * x1 * x7 - 6 * x3 * x5),
+                "z12": -6 * (a1 * a6 + a3 * a5) + emsq * (-24 * (x2 * x7 + x1 * x8) - 6 * (x3 * x6 + x4 * x5)),
+                "z13": -6 * a3 * a6 + emsq * (-24 * x2 * x8 - 6 * x4 * x6),
+                "z21": 6 * a2 * a5 + emsq * (24 * x1 * x5 - 6 * x3 * x7),
+                "z22": 6 * (a4 * a5 + a2 * a6) + emsq * (24 * (x2 * x5 + x1 * x6) - 6 * (x4 * x7 + x3 * x8)),
+                "z23": 6 * a4 * a6 + emsq * (24 * x2 * x6 - 6 * x4 * x8),
+                "z31": z31, "z32": z32, "z33": z33,
+                "s1": -15 * em * s4, "s2": -0.5 * s3 / rtemsq, "s3": s3, "s4": s4,
+                "s5": x1 * x3 + x2 * x4, "s6": x2 * x3 + x1 * x4, "s7": x2 * x4 - x1 * x3}
+
+
+    def __propogateChunk__(self, c: dict, t: np.array) -> tuple:
+        ''' SGP4 / SDP4 at (n,T) minutes since epoch for (n,1) coefficient arrays'''
+        # Secular gravity and atmospheric drag
+        xmdf = c["mo"] + c["mdot"] * t
+        argpdf = c["argpo"] + c["argpdot"] * t
+        nodedf = c["nodeo"] + c["nodedot"] * t
+        t2 = t**2
+        t3 = t2 * t
+        t4 = t3 * t
+        nodem = nodedf + c["nodecf"] * t2
+
+        # Terms the simplified low perigee model zeroes drop out through their coefficients
+        delm = c["xmcof"] * ((1 + c["eta"] * np.cos(xmdf))**3 - c["delmo"])
+        temp = c["omgcof"] * t + delm
+        mm = xmdf + temp
+        argpm = argpdf - temp
+        tempa = 1 - c["cc1"] * t - c["d2"] * t2 - c["d3"] * t3 - c["d4"] * t4
+        tempe = c["bstar"] * c["cc4"] * t + c["bstar"] * c["cc5"] * (np.sin(mm) - c["sinmao"])
+        templ = c["t2cof"] * t2 + c["t3cof"] * t3 + t4 * (c["t4cof"] + t * c["t5cof"])
+
+        # Lunar / solar secular rates and resonances of deep space objects
+        em = np.broadcast_to(c["ecco"], t.shape).copy()
+        inclm = np.broadcast_to(c["inclo"], t.shape).copy()
+        nm = np.broadcast_to(c["noUnkozai"], t.shape).copy()
+        deep = c["deepSpace"][:, 0]
+        if np.any(deep):
+            d = {key: value[deep] for key, value in c.items()}
+            em[deep], inclm[deep], argpm[deep], nodem[deep], mm[deep], nm[deep] = \
+                self.__deepSpaceSecular__(d, t[deep], em[deep], inclm[deep], argpm[deep], nodem[deep], mm[deep])
+
+        invalid = nm <= 0
+        am = (XKE / np.abs(nm))**(2/3) * tempa**2
+        nm = XKE / np.abs(am)**1.5
+        em = em - tempe
+        invalid |= (em >= 1) | (em < -0.001)
+        em = np.maximum(em, 1e-6)
+        mm = mm + c["noUnkozai"] * templ
+        xlm = mm + argpm + nodem
+        nodem = np.fmod(nodem, 2*np.pi)
+        argpm = np.mod(argpm, 2*np.pi)
+        mm = np.mod(xlm - argpm - nodem, 2*np.pi)
+
+        # Lunar / solar periodics of deep space objects
+        ep, xincp, nodep, argpp, mp = em, inclm, nodem, argpm, mm
+        if np.any(deep):
+            ep[deep], xincp[deep], nodep[deep], argpp[deep], mp[deep] = \
+                self.__lunarSolarPeriodics__(d, t[deep], ep[deep], xincp[deep], nodep[deep], argpp[deep], mp[deep])
+            invalid |= (ep < 0) | (ep > 1)
+
+        # Long period periodics, guarded against the 1 / (1 + cos i) singularity of retrograde equatorial orbits
+        sinip, cosip = np.sin(xincp), np.cos(xincp)
+        aycof = -0.5 * J3OJ2 * sinip
+        xlcof = -0.25 * J3OJ2 * sinip * (3 + 5*cosip) / np.where(np.abs(cosip + 1) > 1.5e-12, 1 + cosip, 1.5e-12)
+        axnl = ep * np.cos(argpp)
+        temp = 1 / (am * (1 - ep**2))
+        aynl = ep * np.sin(argpp) + temp * aycof
+        xl = mp + argpp + nodep + temp * xlcof * axnl
+
+        # Kepler's equation in the equinoctial form, steps limited to keep Newton stable
+        u = np.mod(xl - nodep, 2*np.pi)
+        eo1 = u.copy()
+        for n in range(10):
+            sineo1 = np.sin(eo1)
+            coseo1 = np.cos(eo1)
+            tem5 = (u - aynl * coseo1 + axnl * sineo1 - eo1) / (1 - coseo1 * axnl - sineo1 * aynl)
+            eo1 += np.clip(tem5, -0.95, 0.95)
+            if np.all(np.abs(tem5) < 1e-12):
+                break
+
+        sineo1 = np.sin(eo1)
+        coseo1 = np.cos(eo1)
+
+        # Short period periodics
+        ecose = axnl * coseo1 + aynl * sineo1
+        esine = axnl * sineo1 - aynl * coseo1
+        el2 = axnl**2 + aynl**2
+        pl = am * (1 - el2)
+        invalid |= pl < 0
+        pl = np.abs(pl)
+
+        rl = am * (1 - ecose)
+        rdotl = np.sqrt(am) * esine / rl
+        rvdotl = np.sqrt(pl) / rl
+        betal = np.sqrt(1 - el2)
+        temp = esine / (1 + betal)
+        sinu = am / rl * (sineo1 - aynl - axnl * temp)
+        cosu = am / rl * (coseo1 - axnl + aynl * temp)
+        su = np.arctan2(sinu, cosu)
+        sin2u = 2 * cosu * sinu
+        cos2u = 1 - 2 * sinu**2
+        temp1 = 0.5 * J2 / pl
+        temp2 = temp1 / pl
+
+        cosisq = cosip**2
+        con41 = 3 * cosisq - 1
+        x1mth2 = 1 - cosisq
+        mrt = rl * (1 - 1.5 * temp2 * betal * con41) + 0.5 * temp1 * x1mth2 * cos2u
+        su = su - 0.25 * temp2 * (7 * cosisq - 1) * sin2u
+        xnode = nodep + 1.5 * temp2 * cosip * sin2u
+        xinc = xincp + 1.5 * temp2 * cosip * sinip * cos2u
+        mvt = rdotl - nm * temp1 * x1mth2 * sin2u / XKE
+        rvdot = rvdotl + nm * temp1 * (x1mth2 * cos2u + 1.5 * con41) / XKE
+
+        # Orientation vectors
+        sinsu, cossu = np.sin(su), np.cos(su)
+        snod, cnod = np.sin(xnode), np.cos(xnode)
+        sini, cosi = np.sin(xinc), np.cos(xinc)
+        xmx = -snod * cosi
+        xmy = cnod * cosi
+        u = np.stack([xmx * sinsu + cnod * cossu, xmy * sinsu + snod * cossu, sini * sinsu], axis=-1)
+        v = np.stack([xmx * cossu - cnod * sinsu, xmy * cossu - snod * sinsu, sini * cossu], axis=-1)
+
+        rs = (mrt * EARTH_RADIUS)[..., np.newaxis] * u
+        vs = (mvt * EARTH_RADIUS * XKE / 60)[..., np.newaxis] * u + (rvdot * EARTH_RADIUS * XKE / 60)[..., np.newaxis] * v
+
+        # Decayed below the surface or elements out of range
+        invalid |= mrt < 1
+        rs[invalid] = np.nan
+        vs[invalid] = np.nan
+        return rs, vs
+
+
+    def __deepSpaceSecular__(self, d: dict, t: np.array, em: np.array, inclm: np.array, argpm: np.array,
+                             nodem: np.array, mm: np.array) -> tuple:
+        ''' Lunar / solar secular rates and the resonance integration of deep space objects, dspace'''
+        em = em + d["dedt"] * t
+        inclm = inclm + d["didt"] * t
+        argpm = argpm + d["domdt"] * t
+        nodem = nodem + d["dnodt"] * t
+        mm = mm + d["dmdt"] * t
+        nm = np.broadcast_to(d["noUnkozai"], t.shape).copy()
+
+        resonant = d["irez"][:, 0] != 0
+        if np.any(resonant):
+            r = {key: value[resonant] for key, value in d.items()}
+            xl, nm[resonant] = self.__integrateResonance__(r, t[resonant])
+            theta = np.mod(r["gsto"] + t[resonant] * EARTH_ROTATION, 2*np.pi)
+            mm[resonant] = np.where(r["irez"] == 2, xl - 2 * nodem[resonant] + 2 * theta,
+                                    xl - nodem[resonant] - argpm[resonant] + theta)
+
+        return em, inclm, argpm, nodem, mm, nm
+
+
+    def __integrateResonance__(self, r: dict, t: np.array) -> tuple:
+        '''
+            Mean longitude and mean motion of resonant objects at (n,T) minutes since epoch. The fixed step
+            integration from epoch is run once per object and direction, samples are picked up as the
+            integration passes the last whole step before them
+        '''
+        steps = np.floor(np.abs(t) / RESONANCE_STEP).astype(int)
+        delt = np.array([RESONANCE_STEP, -RESONANCE_STEP])     # forward and backward in time
+        rows, columns = np.indices(t.shape)
+        direction = np.where(t > 0, 0, 1)
+        order = np.argsort(steps, axis=None, kind="stable")
+        bounds = np.searchsorted(steps.ravel()[order], np.arange(steps.max() + 2))
+
+        xli = np.repeat(r["xlamo"], 2, axis=1)
+        xni = np.repeat(r["noUnkozai"], 2, axis=1)
+        xliSamples = np.empty(t.shape)
+        xniSamples = np.empty(t.shape)
+        for step in range(steps.max() + 1):
+            samples = order[bounds[step]:bounds[step + 1]]
+            sampleRows, sampleColumns = rows.ravel()[samples], columns.ravel()[samples]
+            sampleDirections = direction[sampleRows, sampleColumns]
+            xliSamples[sampleRows, sampleColumns] = xli[sampleRows, sampleDirections]
+            xniSamples[sampleRows, sampleColumns] = xni[sampleRows, sampleDirections]
+
+            xndt, xldot, xnddt = self.__resonanceRates__(r, xli, xni, step * delt)
+            xli = xli + xldot * delt + xndt * RESONANCE_STEP**2 / 2
+            xni = xni + xndt * delt + xnddt * RESONANCE_STEP**2 / 2
+
+        atime = steps * delt[direction]
+        xndt, xldot, xnddt = self.__resonanceRates__(r, xliSamples, xniSamples, atime)
+        ft = t - atime
+        return xliSamples + xldot * ft + xndt * ft**2 / 2, xniSamples + xndt * ft + xnddt * ft**2 / 2
+
+
+    @staticmethod
+    def __resonanceRates__(r: dict, xli: np.array, xni: np.array, atime: np.array) -> tuple:
+        ''' Mean motion rate, mean longitude rate and mean motion acceleration of the resonance terms'''
+        xldot = xni + r["xfact"]
+
+        # 24 hour synchronous orbits
+        xndt = r["del1"] * np.sin(xli - 0.13130908) + r["del2"] * np.sin(2 * (xli - 2.8843198)) \
+            + r["del3"] * np.sin(3 * (xli - 0.37448087))
+        xnddt = r["del1"] * np.cos(xli - 0.13130908) + 2 * r["del2"] * np.cos(2 * (xli - 2.8843198)) \
+            + 3 * r["del3"] * np.cos(3 * (xli - 0.37448087))
+
+        # 12 hour eccentric semi synchronous orbits
+        xomi = r["argpo"] + r["argpdot"] * atime
+        x2omi = 2 * xomi
+        x2li = 2 * xli
+        semiSynchronous = r["irez"] == 2
+        xndt = np.where(semiSynchronous,
+                        r["d2201"] * np.sin(x2omi + xli - 5.7686396) + r["d2211"] * np.sin(xli - 5.7686396)
+                        + r["d3210"] * np.sin(xomi + xli - 0.95240898) + r["d3222"] * np.sin(-xomi + xli - 0.95240898)
+                        + r["d4410"] * np.sin(x2omi + x2li - 1.8014998) + r["d4422"] * np.sin(x2li - 1.8014998)
+                        + r["d5220"] * np.sin(xomi + xli - 1.0508330) + r["d5232"] * np.sin(-xomi + xli - 1.0508330)
+                        + r["d5421"] * np.sin(xomi + x2li - 4.4108898) + r["d5433"] * np.sin(-xomi + x2li - 4.4108898),
+                        xndt)
+        xnddt = np.where(semiSynchronous,
+                         r["d2201"] * np.cos(x2omi + xli - 5.7686396) + r["d2211"] * np.cos(xli - 5.7686396)
+                         + r["d3210"] * np.cos(xomi + xli - 0.95240898) + r["d3222"] * np.cos(-xomi + xli - 0.95240898)
+                         + r["d5220"] * np.cos(xomi + xli - 1.0508330) + r["d5232"] * np.cos(-xomi + xli - 1.0508330)
+                         + 2 * (r["d4410"] * np.cos(x2omi + x2li - 1.8014998) + r["d4422"] * np.cos(x2li - 1.8014998)
+                                + r["d5421"] * np.cos(xomi + x2li - 4.4108898) + r["d5433"] * np.cos(-xomi + x2li - 4.4108898)),
+                         xnddt)
+        return xndt, xldot, xnddt * xldot
+
+
+    def __lunarSolarPeriodics__(self, d: dict, t: np.array, ep: np.array, inclp: np.array, nodep: np.array,
+                                argpp: np.array, mp: np.array) -> tuple:
+        ''' Applies the lunar / solar periodics to the mean elements of deep space objects, dpper'''
+        pe, pinc, pl, pgh, ph = 0.0, 0.0, 0.0, 0.0, 0.0
+        for body, motion, eccentricity in (("solar", SOLAR_MOTION, SOLAR_ECCENTRICITY), ("lunar", LUNAR_MOTION, LUNAR_ECCENTRICITY)):
+            zm = d[body + "M0"] + motion * t
+            zf = zm + 2 * eccentricity * np.sin(zm)
+            sinzf = np.sin(zf)
+            f2 = 0.5 * sinzf**2 - 0.25
+            f3 = -0.5 * sinzf * np.cos(zf)
+            pe = pe + d[body + "E2"] * f2 + d[body + "E3"] * f3
+            pinc = pinc + d[body + "I2"] * f2 + d[body + "I3"] * f3
+            pl = pl + d[body + "L2"] * f2 + d[body + "L3"] * f3 + d[body + "L4"] * sinzf
+            pgh = pgh + d[body + "Gh2"] * f2 + d[body + "Gh3"] * f3 + d[body + "Gh4"] * sinzf
+            ph = ph + d[body + "H2"] * f2 + d[body + "H3"] * f3
+
+        inclp = inclp + pinc
+        ep = ep + pe
+        sinip, cosip = np.sin(inclp), np.cos(inclp)
+
+        # Applied directly above 0.2 rad, the Lyddane form avoids the 1 / sin i singularity below it
+        with np.errstate(divide="ignore", invalid="ignore"):
+            phs = ph / sinip
+        sinop, cosop = np.sin(nodep), np.cos(nodep)
+        alfdp = sinip * sinop + ph * cosop + pinc * cosip * sinop
+        betdp = sinip * cosop - ph * sinop + pinc * cosip * cosop
+        xls = mp + argpp + pl + pgh + (cosip - pinc * sinip) * nodep
+        nodeLyddane = np.arctan2(alfdp, betdp)
+        nodeLyddane += np.where(np.abs(nodep - nodeLyddane) > np.pi, np.where(nodeLyddane < nodep, 2*np.pi, -2*np.pi), 0.0)
+        mp = mp + pl
+
+        lyddane = inclp < 0.2
+        argpp = np.where(lyddane, xls - mp - cosip * nodeLyddane, argpp + pgh - cosip * phs)
+        nodep = np.where(lyddane, nodeLyddane, nodep + phs)
+
+        # Negative inclinations are flipped through the node
+        flipped = inclp < 0
+        return ep, np.abs(inclp), nodep + np.pi * flipped, argpp - np.pi * flipped, mp
@@ -0,0 +1,238 @@
+import os
+import numpy as np
+
+from .Sgp4 import tleDtype
+from .OrbitTools import julianDate, InvalidParams
+
+
+# Index rows, one per valid element set in file order
+indexDtype = [("name", "U64"), ("satnum", int)]
+
+NAME_WIDTH = 24     # Name lines of three line element sets are 24 columns
+LINE_WIDTH = 69
+
+# Alpha-5 catalog numbers replace the leading digit with a letter, I and O are skipped
+ALPHA5 = np.zeros(256, dtype=int)
+ALPHA5[np.frombuffer(b"0123456789", dtype=np.uint8)] = np.arange(10)
+ALPHA5[np.frombuffer(b"ABCDEFGHJKLMNPQRSTUVWXYZ", dtype=np.uint8)] = np.arange(10, 34)
+
+
+
+class TleCatalog():
+    '''
+        Indexed reader for large two and three line element set files. The file is scanned as one byte
+        array, line pairs and fixed columns are located and converted with array operations, and element
+        sets are only parsed when loaded. The parsed catalog is kept in a binary sidecar file next to the
+        text file and reused while the text file is unchanged
+    '''
+    version = 1     # Bump when the sidecar layout or the parsing changes
+
+    def __init__(self, path: str, useCache: bool = True) -> None:
+        self.path = path
+        self.cachePath = path + ".cache.npz" if useCache else None
+        self.elements = None    # Fully parsed catalog once loaded
+        self.lines = None       # (N, 2, 69) card bytes of the valid sets while not fully parsed
+
+        stat = os.stat(path)
+        self.stamp = np.array([self.version, stat.st_size, stat.st_mtime_ns], dtype=np.int64)
+
+        if not self.__loadCache__():
+            self.__scan__()
+
+        self.order = np.argsort(self.index["satnum"], kind="stable")
+
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+
+    def getIndex(self) -> np.array:
+        ''' Returns the (name, satnum) of every element set in file order'''
+        return self.index
+
+
+    def find(self, satnums: np.array = None, names: list = None) -> np.array:
+        ''' Row numbers of the element sets matching any of the catalog numbers or names, in file order'''
+        rows = np.zeros(len(self.index), dtype=bool)
+        if satnums is not None:
+            satnums = np.atleast_1d(np.asarray(satnums, dtype=int))
+            sortedSatnums = self.index["satnum"][self.order]
+            first = np.searchsorted(sortedSatnums, satnums, side="left")
+            last = np.searchsorted(sortedSatnums, satnums, side="right")
+            for start, end in zip(first, last):
+                rows[self.order[start:end]] = True
+
+        if names is not None:
+            rows |= np.isin(self.index["name"], np.atleast_1d(names))
+
+        return np.flatnonzero(rows)
+
+
+    def load(self, satnums: np.array = None, names: list = None) -> np.array:
+        '''
+            Returns the selected element sets as a tleDtype array, or the whole catalog when no selection
+            is given. Loading the whole catalog writes the sidecar cache
+        '''
+        if satnums is None and names is None:
+            if self.elements is None:
+                self.elements = self.__parse__(self.lines)
+                self.elements["name"] = self.index["name"]
+                self.lines = None
+                self.__storeCache__()
+
+            return self.elements
+
+        rows = self.find(satnums, names)
+        if self.elements is not None:
+            return self.elements[rows]
+
+        elements = self.__parse__(self.lines[rows])
+        elements["name"] = self.index["name"][rows]
+        return elements
+
+
+    def __scan__(self) -> None:
+        ''' Locates the valid line pairs of the file and builds the index without parsing any elements'''
+        buffer = np.fromfile(self.path, dtype=np.uint8)
+        newlines = np.flatnonzero(buffer == ord('\n'))
+        starts = np.hstack([0, newlines + 1])
+        ends = np.hstack([newlines, len(buffer)])
+        keep = starts < len(buffer)
+        starts, ends = starts[keep], ends[keep]
+
+        # Drop the carriage returns of windows line endings
+        padded = np.hstack([buffer, np.frombuffer(b" " * LINE_WIDTH, dtype=np.uint8)])
+        lengths = ends - starts
+        lengths -= (lengths > 0) & (padded[np.maximum(ends - 1, 0)] == ord('\r'))
+
+        first = padded[starts]
+        second = padded[starts + 1]
+        isCard1 = (first == ord('1')) & (second == ord(' ')) & (lengths >= LINE_WIDTH)
+        isCard2 = (first == ord('2')) & (second == ord(' ')) & (lengths >= LINE_WIDTH)
+        pairs = np.flatnonzero(isCard1[:-1] & isCard2[1:])
+
+        columns = np.arange(LINE_WIDTH)
+        lines = np.stack([padded[starts[pairs, np.newaxis] + columns], padded[starts[pairs + 1, np.newaxis] + columns]], axis=1)
+
+        valid = np.all(self.__checksum__(lines) == lines[:, :, 68].astype(int) - ord('0'), axis=1)
+        if not np.all(valid):
+            print("Skipping {} element sets with bad checksums".format(np.count_nonzero(~valid)))
+
+        pairs, lines = pairs[valid], lines[valid]
+        if len(pairs) == 0:
+            raise InvalidParams("No valid element sets in {}".format(self.path))
+
+        # Name lines precede card 1 in three line files, two line files fall back to the catalog number
+        hasName = pairs > 0
+        hasName[hasName] = ~isCard1[pairs[hasName] - 1] & ~isCard2[pairs[hasName] - 1] & (lengths[pairs[hasName] - 1] > 0)
+        nameStarts = starts[np.maximum(pairs - 1, 0)]
+        nameStarts = nameStarts + 2 * ((padded[nameStarts] == ord('0')) & (padded[nameStarts + 1] == ord(' ')))
+        nameLengths = np.where(hasName, starts[np.maximum(pairs - 1, 0)] + lengths[np.maximum(pairs - 1, 0)] - nameStarts, 0)
+        nameColumns = np.arange(NAME_WIDTH)
+        nameBytes = np.where(nameColumns < nameLengths[:, np.newaxis], padded[nameStarts[:, np.newaxis] + nameColumns], ord(' '))
+
+        self.index = np.zeros(len(pairs), dtype=indexDtype)
+        self.index["satnum"] = self.__catalogNumbers__(lines[:, 0])
+        names = np.char.strip(np.char.decode(np.ascontiguousarray(nameBytes, dtype=np.uint8).view("S{}".format(NAME_WIDTH)).ravel(), "latin-1"))
+        self.index["name"] = np.where(names == "", np.char.strip(np.char.decode(self.__field__(lines[:, 0], 2, 7), "latin-1")), names)
+        self.lines = lines
+
+
+    def __parse__(self, lines: np.array) -> np.array:
+        ''' Converts (N, 2, 69) card bytes into a tleDtype array, names are left empty'''
+        card1, card2 = lines[:, 0], lines[:, 1]
+        elements = np.zeros(len(lines), dtype=tleDtype)
+        if len(lines) == 0:
+            return elements
+
+        year = self.__field__(card1, 18, 20).astype(int)
+        year += np.where(year < 57, 2000, 1900)
+        elements["satnum"] = self.__catalogNumbers__(card1)
+        elements["epoch"] = julianDate(year, 1, 1) + self.__field__(card1, 20, 32).astype(float) - 1
+        elements["ndot"] = self.__field__(card1, 33, 43).astype(float)
+        elements["nddot"] = self.__impliedDecimal__(card1, 44)
+        elements["bstar"] = self.__impliedDecimal__(card1, 53)
+        elements["inclination"] = self.__field__(card2, 8, 16).astype(float)
+        elements["raan"] = self.__field__(card2, 17, 25).astype(float)
+        elements["eccentricity"] = self.__digits__(card2[:, 26:33]) / 1e7
+        elements["argOfPerig"] = self.__field__(card2, 34, 42).astype(float)
+        elements["meanAnomaly"] = self.__field__(card2, 43, 51).astype(float)
+        elements["meanMotion"] = self.__field__(card2, 52, 63).astype(float)
+        return elements
+
+
+    @staticmethod
+    def __field__(cards: np.array, start: int, end: int) -> np.array:
+        ''' Fixed columns of every card as a bytes string array, ready for astype'''
+        return np.ascontiguousarray(cards[:, start:end]).view("S{}".format(end - start)).ravel()
+
+
+    @staticmethod
+    def __digits__(columns: np.array) -> np.array:
+        ''' Integer value of columns of digits, blanks count as zero'''
+        digits = columns.astype(int) - ord('0')
+        digits = np.where((digits >= 0) & (digits <= 9), digits, 0)
+        return digits @ 10**np.arange(columns.shape[1] - 1, -1, -1)
+
+
+    @staticmethod
+    def __impliedDecimal__(cards: np.array, start: int) -> np.array:
+        ''' The " 12345-4" assumed decimal point fields, 0.12345e-4'''
+        mantissa = TleCatalog.__digits__(cards[:, start + 1:start + 6]) / 1e5
+        exponent = TleCatalog.__digits__(cards[:, start + 7:start + 8])
+        mantissa = np.where(cards[:, start] == ord('-'), -mantissa, mantissa)
+        exponent = np.where(cards[:, start + 6] == ord('-'), -exponent, exponent)
+        return mantissa * 10.0**exponent
+
+
+    @staticmethod
+    def __checksum__(lines: np.array) -> np.array:
+        ''' Modulo 10 checksum of the first 68 columns of every card'''
+        digits = lines[..., :68].astype(int) - ord('0')
+        counts = np.where((digits >= 0) & (digits <= 9), digits, 0) + (lines[..., :68] == ord('-'))
+        return counts.sum(axis=-1) % 10
+
+
+    @staticmethod
+    def __catalogNumbers__(cards: np.array) -> np.array:
+        return ALPHA5[cards[:, 2]] * 10000 + TleCatalog.__digits__(cards[:, 3:7])
+
+
+    def __loadCache__(self) -> bool:
+        if self.cachePath is None or not os.path.exists(self.cachePath):
+            return False
+
+        try:
+            with np.load(self.cachePath) as data:
+                if not np.array_equal(data["stamp"], self.stamp):
+                    return False
+
+                self.elements = data["elements"]
+
+        except (OSError, ValueError, KeyError):
+            print("Discarding unreadable TLE sidecar cache {}".format(self.cachePath))
+            return False
+
+        self.index = np.zeros(len(self.elements), dtype=indexDtype)
+        self.index["name"] = self.elements["name"]
+        self.index["satnum"] = self.elements["satnum"]
+        return True
+
+
+    def __storeCache__(self) -> None:
+        if self.cachePath is None:
+            return
+
+        tmpPath = self.cachePath + ".tmp"
+        try:
+            with open(tmpPath, "wb") as cacheFile:
+                np.savez(cacheFile, stamp=self.stamp, elements=self.elements)
+
+            os.replace(tmpPath, self.cachePath)
+
+        except OSError as error:
+            print("Unable to write TLE sidecar cache {}: {}".format(self.cachePath, error))
+            try:
+                os.remove(tmpPath)
+            except OSError:
+                pass
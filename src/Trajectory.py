@@ -0,0 +1,143 @@
+from collections import OrderedDict
+import numpy as np
+
+from .OrbitTools import keplerUniversalPropogate, OrbitPropogationError
+
+
+class HermiteInterpolant():
+    '''
+        Interpolates sampled two-body states. Positions use the velocities as slopes and
+        velocities use the two-body accelerations, so both are third order accurate.
+        Each query only reads its bracketing samples, memory mapped arrays are never loaded whole
+    '''
+    def __init__(self, ts: np.array, rs: np.array, vs: np.array, mu: float) -> None:
+        self.ts = np.asarray(ts, dtype=float)
+        self.rs = rs
+        self.vs = vs
+        self.mu = mu
+
+        if len(self.ts) < 2:
+            raise OrbitPropogationError("At least two samples are needed to interpolate a trajectory")
+
+    def __call__(self, ts: np.array) -> np.array:
+        ts = np.atleast_1d(np.asarray(ts, dtype=float))
+        i = np.clip(np.searchsorted(self.ts, ts, side='right') - 1, 0, len(self.ts) - 2)
+
+        h = (self.ts[i + 1] - self.ts[i])[:, np.newaxis]
+        s = (ts[:, np.newaxis] - self.ts[i][:, np.newaxis]) / h
+        r0, r1 = np.asarray(self.rs[i], dtype=float), np.asarray(self.rs[i + 1], dtype=float)
+        v0, v1 = np.asarray(self.vs[i], dtype=float), np.asarray(self.vs[i + 1], dtype=float)
+        a0 = -self.mu * r0 / np.linalg.norm(r0, axis=1)[:, np.newaxis]**3
+        a1 = -self.mu * r1 / np.linalg.norm(r1, axis=1)[:, np.newaxis]**3
+
+        # Cubic Hermite basis functions
+        h00 = (1 + 2*s) * (1 - s)**2
+        h10 = s * (1 - s)**2
+        h01 = s**2 * (3 - 2*s)
+        h11 = s**2 * (s - 1)
+
+        rs = h00*r0 + h10*h*v0 + h01*r1 + h11*h*v1
+        vs = h00*v0 + h10*h*a0 + h01*v1 + h11*h*a1
+        return np.vstack([rs.T, vs.T])
+
+
+
+class KeplerInterpolant():
+    ''' Evaluates the closed form two-body solution, exact at any time'''
+    def __init__(self, r0: np.array, v0: np.array, mu: float) -> None:
+        self.r0 = np.asarray(r0, dtype=float)
+        self.v0 = np.asarray(v0, dtype=float)
+        self.mu = mu
+
+    def __call__(self, ts: np.array) -> np.array:
+        rs, vs = keplerUniversalPropogate(self.r0, self.v0, ts, self.mu)
+        return np.vstack([rs.T, vs.T])
+
+
+
+class Trajectory():
+    '''
+        Propogated trajectory backed by an interpolant. Any callable mapping an array of
+        times (T,) to states (6,T) works, e.g. the dense output of solve_ivp.
+        States are evaluated lazily and the most recently used time grids are cached
+    '''
+    def __init__(self, interpolant, tStart: float, tEnd: float, maxCachedGrids: int = 8) -> None:
+        self.interpolant = interpolant
+        self.tStart = tStart
+        self.tEnd = tEnd
+        self.maxCachedGrids = maxCachedGrids
+        self.cache = OrderedDict()
+
+
+    @staticmethod
+    def fromSamples(ts: np.array, rs: np.array, vs: np.array, mu: float) -> 'Trajectory':
+        ''' Builds a trajectory from states sampled on a fixed time grid'''
+        ts = np.asarray(ts, dtype=float)
+
+        # A run shorter than one step has a single sample, the two-body solution from it spans that instant
+        if len(ts) < 2:
+            return Trajectory(KeplerInterpolant(rs[0], vs[0], mu), ts[0], ts[0])
+
+        return Trajectory(HermiteInterpolant(ts, rs, vs, mu), ts[0], ts[-1])
+
+
+    def getTimeSpan(self) -> tuple:
+        return (self.tStart, self.tEnd)
+
+
+    def sample(self, ts: np.array) -> tuple:
+        ''' Returns read only (T,3) position and velocity arrays at the requested times'''
+        ts = np.ascontiguousarray(ts, dtype=float)
+
+        # Allow a little round off on the end points of a requested grid
+        tol = 1e-9 * max(1.0, abs(self.tEnd - self.tStart))
+        if ts.size and (ts.min() < self.tStart - tol or ts.max() > self.tEnd + tol):
+            raise OrbitPropogationError("Requested times outside the propogated span [{}, {}]".format(self.tStart, self.tEnd))
+
+        key = (ts.size, hash(ts.tobytes()))
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            return self.cache[key]
+
+        ys = self.interpolant(np.clip(ts, self.tStart, self.tEnd))
+        rs = np.ascontiguousarray(ys[:3].T)
+        vs = np.ascontiguousarray(ys[3:].T)
+        rs.flags.writeable = False
+        vs.flags.writeable = False
+
+        self.cache[key] = (rs, vs)
+        if len(self.cache) > self.maxCachedGrids:
+            self.cache.popitem(last=False)
+
+        return rs, vs
+
+
+    def evaluate(self, ts: np.array) -> tuple:
+        ''' Returns (T,3) positions and velocities without touching the grid cache, for root finders probing scattered times'''
+        ys = self.interpolant(np.clip(np.atleast_1d(np.asarray(ts, dtype=float)), self.tStart, self.tEnd))
+        return ys[:3].T, ys[3:].T
+
+
+    def sampleUniform(self, nPoints: int) -> tuple:
+        ''' Samples n evenly spaced times over the whole span, returns (ts, rs, vs)'''
+        ts = np.linspace(self.tStart, self.tEnd, max(int(nPoints), 2))
+        rs, vs = self.sample(ts)
+        return ts, rs, vs
+
+
+    def sampleStep(self, dt: float) -> tuple:
+        ''' Samples every dt seconds from the start of the span, returns (ts, rs, vs)'''
+        ts = np.arange(self.tStart, self.tEnd + 0.5*dt, dt)
+        ts = ts[ts <= self.tEnd]
+        rs, vs = self.sample(ts)
+        return ts, rs, vs
+
+
+    def getRadiusArray(self, ts: np.array) -> np.array:
+        return self.sample(ts)[0]
+
+    def getVelocityArray(self, ts: np.array) -> np.array:
+        return self.sample(ts)[1]
+
+    def clearCache(self) -> None:
+        self.cache.clear()
@@ -0,0 +1,157 @@
+from collections import OrderedDict
+import hashlib
+import os
+import numpy as np
+
+
+class TrajectoryCache():
+    '''
+        Content addressed cache of propogated trajectories.
+        Entries are keyed on the initial conditions and integrator settings and kept in an
+        in-memory LRU tier backed by a size capped on-disk tier of .npz files
+    '''
+    version = 1     # Bump when the stored layout or the propogators change results
+
+    def __init__(self, cacheDir: str = os.path.join("Resources", "trajectory_cache"), maxMemoryBytes: int = 256 * 2**20,
+                 maxDiskBytes: int = 512 * 2**20) -> None:
+        self.cacheDir = cacheDir
+        self.maxMemoryBytes = maxMemoryBytes
+        self.maxDiskBytes = maxDiskBytes
+        self.memory = OrderedDict()
+        self.memoryBytes = 0
+
+        if self.cacheDir is not None:
+            os.makedirs(self.cacheDir, exist_ok=True)
+
+
+    @staticmethod
+    def makeKey(r0: list, v0: list, mu: float, timelength: float, timeStep: float, propogator: str,
+                rtol: float, atol: float, substeps: int = 1) -> str:
+        ''' Returns a hex digest identifying one propogation'''
+        values = np.hstack([np.asarray(r0, dtype=float), np.asarray(v0, dtype=float), [mu, timelength, timeStep, rtol, atol, substeps]])
+        digest = hashlib.sha1(values.astype('<f8').tobytes())
+        digest.update("{}:{}".format(TrajectoryCache.version, propogator).encode())
+        return digest.hexdigest()
+
+
+    def get(self, key: str) -> tuple:
+        ''' Returns read only views of the cached (rs, vs) arrays or None, every caller shares the same entry'''
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            return self.__readOnly__(*self.memory[key])
+
+        path = self.__getPath__(key)
+        if path is None or not os.path.exists(path):
+            return None
+
+        try:
+            with np.load(path) as data:
+                rs = data["rs"]
+                vs = data["vs"]
+
+        except (OSError, ValueError, KeyError):
+            print("Discarding unreadable trajectory cache file {}".format(path))
+            self.__remove__(path)
+            return None
+
+        # Mark the file as recently used for disk eviction
+        os.utime(path)
+        self.__storeInMemory__(key, rs, vs)
+        return self.__readOnly__(rs, vs)
+
+
+    def put(self, key: str, rs: np.array, vs: np.array) -> None:
+        self.__storeInMemory__(key, rs, vs)
+
+        path = self.__getPath__(key)
+        if path is None:
+            return
+
+        tmpPath = path + ".tmp"
+        try:
+            with open(tmpPath, "wb") as cacheFile:
+                np.savez(cacheFile, rs=rs, vs=vs)
+
+            os.replace(tmpPath, path)
+
+        except OSError as error:
+            print("Unable to write trajectory cache file {}: {}".format(path, error))
+            self.__remove__(tmpPath)
+            return
+
+        self.__evictDisk__()
+
+
+    def clear(self) -> None:
+        self.memory.clear()
+        self.memoryBytes = 0
+
+        if self.cacheDir is None:
+            return
+
+        for name in os.listdir(self.cacheDir):
+            if name.endswith(".npz"):
+                self.__remove__(os.path.join(self.cacheDir, name))
+
+
+    def __getPath__(self, key: str) -> str:
+        if self.cacheDir is None:
+            return None
+
+        return os.path.join(self.cacheDir, key + ".npz")
+
+
+    @staticmethod
+    def __readOnly__(rs: np.array, vs: np.array) -> tuple:
+        rs, vs = rs.view(), vs.view()
+        rs.flags.writeable = False
+        vs.flags.writeable = False
+        return rs, vs
+
+
+    def __storeInMemory__(self, key: str, rs: np.array, vs: np.array) -> None:
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            return
+
+        # Views of a larger state buffer keep all of it alive, hold compact copies so nbytes is what an entry costs
+        rs = rs if rs.base is None and rs.flags.c_contiguous else np.array(rs)
+        vs = vs if vs.base is None and vs.flags.c_contiguous else np.array(vs)
+
+        self.memory[key] = (rs, vs)
+        self.memoryBytes += rs.nbytes + vs.nbytes
+
+        while self.memoryBytes > self.maxMemoryBytes and len(self.memory) > 1:
+            _, (oldRs, oldVs) = self.memory.popitem(last=False)
+            self.memoryBytes -= oldRs.nbytes + oldVs.nbytes
+
+
+    def __evictDisk__(self) -> None:
+        entries = []
+        for name in os.listdir(self.cacheDir):
+            if not name.endswith(".npz"):
+                continue
+
+            path = os.path.join(self.cacheDir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        # Remove least recently used files until the directory fits the cap
+        totalBytes = sum(entry[1] for entry in entries)
+        for _, size, path in sorted(entries):
+            if totalBytes <= self.maxDiskBytes:
+                break
+
+            self.__remove__(path)
+            totalBytes -= size
+
+
+    def __remove__(self, path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
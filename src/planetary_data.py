@@ -2,6 +2,7 @@ class planetaryData:
     bodyList = ["Sun", "Mercury", "Venus", "Earth", "Moon", "Mars", "Jupiter", "Saturn", "Uranus", "Neptune", "Pluto"]
 
     AU = 1.496e8  # km
+    J2000 = 2451545.0   # Julian date of the ephemeris epoch
 
     class base:
         name = None
@@ -10,6 +11,7 @@ class planetaryData:
         radius = None
         colormap = None
         qtColor = None
+        ephemeris = None    # Heliocentric mean elements at J2000 and their rates per Julian century
     
     class Sun:
         name = "Sun"
@@ -33,6 +35,9 @@ class planetaryData:
         DU = 6378.1   # km
         TU = 806.8    # Seconds
         MU = 5.972e24 # kg
+        # a (AU), e, i, mean longitude, longitude of perihelion, raan (deg)
+        ephemeris = ([0.38709927, 0.20563593, 7.00497902, 252.25032350, 77.45779628, 48.33076593],
+                     [0.00000037, 0.00001906, -0.00594749, 149472.67411175, 0.16047689, -0.12534081])
 
     class Venus:
         name = "Venus"
@@ -44,6 +49,9 @@ class planetaryData:
         DU = 6378.1   # km
         TU = 806.8    # Seconds
         MU = 5.972e24 # kg
+        # a (AU), e, i, mean longitude, longitude of perihelion, raan (deg)
+        ephemeris = ([0.72333566, 0.00677672, 3.39467605, 181.97909950, 131.60246718, 76.67984255],
+                     [0.00000390, -0.00004107, -0.00078890, 58517.81538729, 0.00268329, -0.27769418])
 
 
     class Earth:
@@ -56,6 +64,9 @@ class planetaryData:
         DU = 6378.1   # km
         TU = 806.8    # Seconds
         MU = 5.972e24 # kg
+        # a (AU), e, i, mean longitude, longitude of perihelion, raan (deg) of the Earth-Moon barycenter
+        ephemeris = ([1.00000261, 0.01671123, -0.00001531, 100.46457166, 102.93768193, 0.0],
+                     [0.00000562, -0.00004392, -0.01294668, 35999.37244981, 0.32327364, 0.0])
 
 
     class Moon:
@@ -81,6 +92,9 @@ class planetaryData:
         DU = 6378.1   # km
         TU = 806.8    # Seconds
         MU = 5.972e24 # kg
+        # a (AU), e, i, mean longitude, longitude of perihelion, raan (deg)
+        ephemeris = ([1.52371034, 0.09339410, 1.84969142, -4.55343205, -23.94362959, 49.55953891],
+                     [0.00001847, 0.00007882, -0.00813131, 19140.30268499, 0.44441088, -0.29257343])
 
 
     class Jupiter:
@@ -93,6 +107,9 @@ class planetaryData:
         DU = 6378.1   # km
         TU = 806.8    # Seconds
         MU = 5.972e24 # kg
+        # a (AU), e, i, mean longitude, longitude of perihelion, raan (deg)
+        ephemeris = ([5.20288700, 0.04838624, 1.30439695, 34.39644051, 14.72847983, 100.47390909],
+                     [-0.00011607, -0.00013253, -0.00183714, 3034.74612775, 0.21252668, 0.20469106])
 
 
     class Saturn:
@@ -105,6 +122,9 @@ class planetaryData:
         DU = 6378.1   # km
         TU = 806.8    # Seconds
         MU = 5.972e24 # kg
+        # a (AU), e, i, mean longitude, longitude of perihelion, raan (deg)
+        ephemeris = ([9.53667594, 0.05386179, 2.48599187, 49.95424423, 92.59887831, 113.66242448],
+                     [-0.00125060, -0.00050991, 0.00193609, 1222.49362201, -0.41897216, -0.28867794])
 
 
 
@@ -118,6 +138,9 @@ class planetaryData:
         DU = 6378.1   # km
         TU = 806.8    # Seconds
         MU = 5.972e24 # kg
+        # a (AU), e, i, mean longitude, longitude of perihelion, raan (deg)
+        ephemeris = ([19.18916464, 0.04725744, 0.77263783, 313.23810451, 170.95427630, 74.01692503],
+                     [-0.00196176, -0.00004397, -0.00242939, 428.48202785, 0.40805281, 0.04240589])
 
 
     class Neptune:
@@ -130,6 +153,9 @@ class planetaryData:
         DU = 6378.1   # km
         TU = 806.8    # Seconds
         MU = 5.972e24 # kg
+        # a (AU), e, i, mean longitude, longitude of perihelion, raan (deg)
+        ephemeris = ([30.06992276, 0.00859048, 1.77004347, -55.12002969, 44.96476227, 131.78422574],
+                     [0.00026291, 0.00005105, 0.00035372, 218.45945325, -0.32241464, -0.00508664])
 
 
 
@@ -142,4 +168,7 @@ class planetaryData:
         qtColor = (0, 0, 1, 1)
         DU = 6378.1   # km
         TU = 806.8    # Seconds
-        MU = 5.972e24 # kg
\ No newline at end of file
+        MU = 5.972e24 # kg
+        # a (AU), e, i, mean longitude, longitude of perihelion, raan (deg)
+        ephemeris = ([39.48211675, 0.24882730, 17.14001206, 238.92903833, 224.06891629, 110.30393684],
+                     [-0.00031596, 0.00005170, 0.00004818, 145.20780515, -0.04062942, -0.01183482])
\ No newline at end of file